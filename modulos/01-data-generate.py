@@ -4,6 +4,7 @@ from pathlib import Path
 from typing import Dict, List
 from datetime import datetime
 import os
+from storage import compressed_path, csv_compression
 
 # Configure logging
 logging.basicConfig(
@@ -30,7 +31,7 @@ def save_dataframe(df: pd.DataFrame, output_path: str) -> None:
         Path(output_path).parent.mkdir(parents=True, exist_ok=True)
         
         # Save the file
-        df.to_csv(output_path, index=False)
+        df.to_csv(output_path, index=False, compression=csv_compression(output_path))
         logger.info(f"Data successfully saved to {output_path}")
     except Exception as e:
         logger.error(f"Error saving data: {str(e)}")
@@ -46,7 +47,7 @@ def main():
         # Save data
         dir = os.path.dirname(os.path.abspath(__file__))
         timestamp = datetime.now().strftime("%Y%m%d_%H%M%S")
-        output_path = os.path.join(dir, f"arquivos/processed_data_{timestamp}.csv")
+        output_path = compressed_path(os.path.join(dir, f"arquivos/processed_data_{timestamp}.csv"))
         save_dataframe(df_raw, output_path)
         
     except Exception as e:
@@ -1,7 +1,9 @@
-import boto3
 import logging
 from botocore.exceptions import ClientError
 import os
+from typing import Optional
+from storage import get_s3_client, upload_artifact
+from lake import partition_key, run_date
 
 # Configure logging
 logging.basicConfig(
@@ -30,15 +32,8 @@ def get_latest_file(folder: str) -> str:
 bucket_name = 'data-lake-p6-890447484968'
 region = 'us-east-2'
 folder = 'arquivos'
-try:
-    last_file = get_latest_file(folder)
-    file_path = os.path.join(folder, last_file)
-except FileNotFoundError as e:
-    print(e)
-
 raw_bucket = 'raw-data'
-object_name = os.path.join(raw_bucket, last_file)
-s3 = boto3.client('s3')
+s3 = get_s3_client()
 
 # Função para verificar se o bucket existe
 def check_create_bucket(bucket_name: str, region: str):
@@ -80,13 +75,25 @@ def check_create_bucket(bucket_name: str, region: str):
             raise
 
 
-if __name__ == "__main__":
+def main(file_path: Optional[str] = None):
+    # A caller passing the file (the daemon) gets the error raised, so the next stages do not run on a failed one
+    raise_errors = file_path is not None
     try:
+        if file_path is None:
+            file_path = os.path.join(folder, get_latest_file(folder))
+        last_file = os.path.basename(file_path)
+        object_name = partition_key(raw_bucket, last_file, run_date(last_file))
+        
         result = check_create_bucket(bucket_name, region)
         if result is None:
             logger.error("Failed to verify/create bucket due to validation errors")
         
-        s3.upload_file(file_path, bucket_name, object_name)
-        logger.info(f"File '{last_file}' send to '{bucket_name}/{object_name}' successfully.")
+        if upload_artifact(s3, file_path, bucket_name, object_name):
+            logger.info(f"File '{last_file}' send to '{bucket_name}/{object_name}' successfully.")
     except Exception as e:
-        logger.error(f"Operation failed: {str(e)}")
\ No newline at end of file
+        logger.error(f"Operation failed: {str(e)}")
+        if raise_errors:
+            raise
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
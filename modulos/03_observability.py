@@ -3,8 +3,10 @@ import json
 import re
 import pandas as pd
 import os
-import boto3
+from typing import Optional
 from botocore.exceptions import ClientError
+from storage import compressed_path, get_s3_client, is_csv, open_artifact, strip_compression, upload_artifact
+from lake import partition_key, run_date
 
 # Configure logging
 logging.basicConfig(
@@ -15,7 +17,7 @@ logger = logging.getLogger(__name__)
 
 def get_latest_file(folder: str) -> str:
     """Get the latest modified CSV file in the specified directory."""
-    files = [os.path.join(folder, f) for f in os.listdir(folder) if os.path.isfile(os.path.join(folder, f)) and f.endswith('.csv')]
+    files = [os.path.join(folder, f) for f in os.listdir(folder) if os.path.isfile(os.path.join(folder, f)) and is_csv(f)]
     if not files:
         raise FileNotFoundError(f"No CSV files found in the folder: {folder}")
     latest_file = max(files, key=os.path.getmtime)
@@ -58,6 +60,7 @@ def calculate_observability_metrics(df):
             'total_linhas': int(len(df)),
             'colunas': df.columns.tolist(),
             'colunas_nulas': df.isnull().sum().astype(int).to_dict(),
+            'ids_duplicados': int(df['id'].dropna().duplicated().sum()) if 'id' in df.columns else None,
             'tipos_dados': df.dtypes.astype(str).to_dict(),
             'estatisticas_quantitativas': estatisticas_quantitativas,
             'estatisticas_categoricas': estatisticas_categoricas
@@ -77,16 +80,16 @@ def save_observability_metrics(metrics, file_path, bucket_name):
     os.makedirs(output_dir, exist_ok=True)
     
     # Extract base filename without extension
-    base_filename = os.path.splitext(os.path.basename(file_path))[0]
+    base_filename = os.path.splitext(os.path.basename(strip_compression(file_path)))[0]
     end_name = re.findall(r'[0-9_]+', base_filename)
     
     # Construct output paths
-    local_path = os.path.join(output_dir, f'observability{end_name[1]}.json')
-    s3_path = f'observability/{base_filename}.json'
+    local_path = compressed_path(os.path.join(output_dir, f'observability{end_name[1]}.json'))
+    s3_path = partition_key('observability', os.path.basename(compressed_path(f'{base_filename}.json')), run_date(file_path))
     
     # Save locally
     try:
-        with open(local_path, 'w') as f:
+        with open_artifact(local_path, 'wt') as f:
             json.dump(metrics, f, indent=4)
         logger.info(f"Observability metrics saved locally to {local_path}")
     except IOError as e:
@@ -95,14 +98,14 @@ def save_observability_metrics(metrics, file_path, bucket_name):
 
     # Upload to S3
     try:
-        s3 = boto3.client('s3')
-        s3.upload_file(local_path, bucket_name, s3_path)
-        logger.info(f"Observability metrics uploaded to S3 as {s3_path}")
+        s3 = get_s3_client()
+        if upload_artifact(s3, local_path, bucket_name, s3_path):
+            logger.info(f"Observability metrics uploaded to S3 as {s3_path}")
     except ClientError as e:
         logger.error(f"Error uploading to S3: {str(e)}")
         raise
 
-if __name__ == "__main__":
+def main(file_path: Optional[str] = None):
     try:
         # Configuration
         bucket_name = 'data-lake-p6-890447484968'
@@ -113,10 +116,11 @@ if __name__ == "__main__":
         os.makedirs(folder, exist_ok=True)
                
         try:
-            dir = os.path.dirname(os.path.abspath(__file__))
-            full_path = os.path.join(dir, folder)
-            last_file = get_latest_file(full_path)
-            file_path = os.path.join(full_path, last_file)
+            if file_path is None:
+                dir = os.path.dirname(os.path.abspath(__file__))
+                full_path = os.path.join(dir, folder)
+                last_file = get_latest_file(full_path)
+                file_path = os.path.join(full_path, last_file)
             
             df = pd.read_csv(file_path)
             metrics = calculate_observability_metrics(df)
@@ -129,4 +133,7 @@ if __name__ == "__main__":
             
     except Exception as e:
         logger.error(f"Failed to process observability metrics: {str(e)}")
-        raise
\ No newline at end of file
+        raise
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
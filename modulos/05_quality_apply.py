@@ -1,56 +1,138 @@
+import numpy as np
 import pandas as pd
 import logging
 import os
 import re
-import boto3
 import great_expectations as ge
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+from storage import compressed_path, csv_compression, file_fingerprint, get_s3_client, is_csv, upload_artifact
+from schemas import extend_schema, read_dataset
+from dedup import deduplicate
+from cleaning import CLEANING_DATASET, compile_rules
+from handoff import write_handoff
+from lake import carry_partition_column, partition_files, partition_key, run_date
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+# Expectations (from 04_validates_raw_data_quality.py) whose failing rows cannot be repaired and go to quarantine
+QUARANTINE_EXPECTATIONS = ['expect_column_values_to_not_be_null:id']
+
 def get_latest_file(folder: str) -> str:
     """Gets the most recent CSV file in the specified directory."""
-    files = [f for f in os.listdir(folder) if f.endswith('.csv') and os.path.isfile(os.path.join(folder, f))]
+    files = [f for f in os.listdir(folder) if is_csv(f) and os.path.isfile(os.path.join(folder, f))]
     if not files:
         raise FileNotFoundError(f"No CSV files found in the folder: {folder}")
     return max(files, key=lambda f: os.path.getmtime(os.path.join(folder, f)))
 
-def load_and_prepare_data(file_path: str) -> pd.DataFrame:
-    """Loads and prepares data from the CSV file."""
-    df = pd.read_csv(file_path)
+def load_failure_index(index_path: str, file_path: str) -> Optional[Dict[str, Any]]:
+    """Loads the row-level failure index written by the raw data validation, if present and built from this version of the file."""
+    if not os.path.isfile(index_path):
+        logger.warning(f"Failure index not found: {index_path}. Invalid ids will be detected during cleaning.")
+        return None
+    with np.load(index_path) as data:
+        failure_index = {key: data[key] for key in data.files}
+    
+    fingerprint = list(file_fingerprint(file_path).values())
+    if 'origem' not in failure_index or failure_index['origem'].tolist() != fingerprint:
+        logger.warning(f"Failure index {index_path} was built from another version of {file_path}. Ignoring it.")
+        return None
+    return failure_index
+
+def indexed_null_checks(failure_index: Dict[str, Any]) -> List[str]:
+    """Lists the columns whose nulls were already routed to quarantine by the failure index."""
+    expectations = failure_index['expectations'].tolist()
+    prefix = 'expect_column_values_to_not_be_null:'
+    return [name[len(prefix):] for name in QUARANTINE_EXPECTATIONS if name.startswith(prefix) and name in expectations]
+
+def split_quarantine(df: pd.DataFrame, failure_index: Dict[str, Any]) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Routes the rows failing a quarantine expectation out of the DataFrame, using the failure index."""
+    expectations = failure_index['expectations'].tolist()
+    failures = np.unpackbits(failure_index['bitmap'], axis=1, count=len(expectations)).astype(bool)
+    quarantine_cols = [i for i, name in enumerate(expectations) if name in QUARANTINE_EXPECTATIONS]
+    to_quarantine = failures[:, quarantine_cols].any(axis=1)
     
-    df['id'] = pd.to_numeric(df['id'], errors='coerce')
-    df = df.dropna(subset=['id'])
-    df['id'] = df['id'].astype(int)
+    quarantine = df[to_quarantine].copy()
+    quarantine['falhas'] = [
+        ';'.join(name for name, failed in zip(expectations, row) if failed)
+        for row in failures[to_quarantine]
+    ]
+    return df[~to_quarantine], quarantine
+
+def load_and_prepare_data(file_path: str, failure_index: Optional[Dict[str, Any]] = None,
+                          dataset: str = CLEANING_DATASET) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """Loads and prepares data from the CSV file, returning the cleaned and the quarantined rows."""
+    # Cleaning rules declared per column (cleaning.py), compiled into a single vectorized plan.
+    # The plan coerces the columns itself, so they are read as is, including the columns only named in the rules.
+    plan = compile_rules(dataset)
+    extend_schema(dataset, plan.columns)
+    carry_partition_column(dataset)
+    raw, _ = read_dataset(file_path, dataset, coerce=False)
+    
+    if failure_index is not None and int(failure_index['total_linhas']) != len(raw):
+        logger.warning("Failure index does not match the input file. Ignoring it.")
+        failure_index = None
+    
+    if failure_index is not None:
+        raw, quarantine = split_quarantine(raw, failure_index)
+        # The null checks evaluated by the raw validation are not repeated
+        checked = indexed_null_checks(failure_index)
+    else:
+        quarantine = raw.iloc[0:0].assign(falhas=pd.Series(dtype=str))
+        checked = []
     
-    df['idade'] = pd.to_numeric(df['idade'], errors='coerce')
-    df['idade'] = df['idade'].clip(0, 120)
-    df['idade'] = df['idade'].fillna(df['idade'].mean()).round(1)
+    # Rows dropped by the rules (e.g. invalid id) not caught by the failure index are quarantined as well, never silently dropped
+    df, dropped = plan.filter(raw, checked)
+    if not dropped.empty:
+        reasons = dropped.map(lambda columns: ';'.join(f'expect_column_values_to_not_be_null:{c}' for c in columns.split(';')))
+        quarantine = pd.concat([quarantine, raw.loc[dropped.index].assign(falhas=reasons)])
     
-    df['salario'] = pd.to_numeric(df['salario'], errors='coerce')
-    df['salario'] = df['salario'].clip(lower=0)
-    df['salario'] = df['salario'].fillna(df['salario'].mean())
+    # Duplicated ids break downstream joins: keep one row per id and quarantine the others
+    df, duplicates = deduplicate(df)
+    if not duplicates.empty:
+        quarantine = pd.concat([quarantine, raw.loc[duplicates.index].assign(falhas='expect_column_values_to_be_unique:id')])
     
-    df['nome'] = df['nome'].fillna('Unknown')
+    if not quarantine.empty:
+        logger.warning(f"{len(quarantine)} rows routed to quarantine.")
     
-    return df
+    df = plan.transform(df)
+    
+    return df, quarantine
 
 def save_to_csv(df: pd.DataFrame, file_path: str) -> None:
     """Saves the DataFrame to a CSV file."""
-    df.to_csv(file_path, index=False)
+    df.to_csv(file_path, index=False, compression=csv_compression(file_path))
     logger.info(f"Cleaned data saved to: {file_path}")
 
+def save_quarantine(quarantine: pd.DataFrame, file_path: str) -> None:
+    """Saves the quarantined rows, with their failed expectations, for audit."""
+    os.makedirs(os.path.dirname(file_path), exist_ok=True)
+    quarantine.to_csv(file_path, index=False, compression=csv_compression(file_path))
+    logger.info(f"Quarantined data saved to: {file_path}")
+
 def upload_to_s3(file_path: str, bucket_name: str, s3_key: str) -> None:
     """Uploads the file to S3."""
-    s3 = boto3.client('s3')
-    s3.upload_file(file_path, bucket_name, s3_key)
-    logger.info(f"File uploaded to S3: s3://{bucket_name}/{s3_key}")
+    s3 = get_s3_client()
+    if upload_artifact(s3, file_path, bucket_name, s3_key):
+        logger.info(f"File uploaded to S3: s3://{bucket_name}/{s3_key}")
+
+@lru_cache(maxsize=None)
+def get_expectation_suite() -> Optional[ge.core.ExpectationSuite]:
+    """Loads the expectation suite of the Great Expectations project once per process, or None when there is no project."""
+    try:
+        context = ge.data_context.DataContext()
+        return context.get_expectation_suite("my_suite")
+    except ge.exceptions.DataContextError as e:
+        logger.warning(f"Expectation suite 'my_suite' not available ({str(e)}). Cleaned data is validated by the next stage only.")
+        return None
 
 def validate_data(df: pd.DataFrame) -> None:
     """Validates the data using Great Expectations."""
-    context = ge.data_context.DataContext()
-    suite = context.get_expectation_suite("my_suite")
+    suite = get_expectation_suite()
+    if suite is None:
+        return
     validator = ge.dataset.PandasDataset(df, expectation_suite=suite)
     results = validator.validate()
     if not results["success"]:
@@ -58,28 +140,41 @@ def validate_data(df: pd.DataFrame) -> None:
     else:
         logger.info("Data validation completed successfully.")
 
-def main():
+def main(file_path: Optional[str] = None):
+    # A caller passing the file (the daemon) gets the error raised, so the next stages do not run on a failed one
+    raise_errors = file_path is not None
     try:
         bucket_name = 'data-lake-p6-890447484968'
         folder = 'arquivos'
         dir_path = os.path.dirname(os.path.abspath(__file__))
         full_path = os.path.join(dir_path, folder)
         
-        last_file = get_latest_file(full_path)
-        file_path = os.path.join(full_path, last_file)
-        
-        df = load_and_prepare_data(file_path)
+        if file_path is None:
+            last_file = get_latest_file(full_path)
+            file_path = os.path.join(full_path, last_file)
         
         # Extract base filename without extension
         base_filename = os.path.splitext(os.path.basename(file_path))[0]
         end_name = re.findall(r'[0-9_]+', base_filename)
         
-        clean_data_path = os.path.join(full_path, f"cleaned_data{end_name[1]}.csv")
+        failure_index = load_failure_index(os.path.join(full_path, f"failure_index{end_name[1]}.npz"), file_path)
+        df, quarantine = load_and_prepare_data(file_path, failure_index)
+        
+        # Quarantine goes to a subfolder so it is never picked up as the latest CSV by the next stages
+        if not quarantine.empty:
+            quarantine_path = compressed_path(os.path.join(full_path, 'quarantine', f"quarantine_data{end_name[1]}.csv"))
+            save_quarantine(quarantine, quarantine_path)
+            upload_to_s3(quarantine_path, bucket_name, partition_key('quarantine-data', os.path.basename(quarantine_path), run_date(quarantine_path)))
+        
+        clean_data_path = compressed_path(os.path.join(full_path, f"cleaned_data{end_name[1]}.csv"))
         
         save_to_csv(df, clean_data_path)
+        write_handoff(df, clean_data_path)
         
-        s3_key = 'processed-data/cleaned_data{end_name[1]}.csv'
-        upload_to_s3(clean_data_path, bucket_name, s3_key)
+        # Hive-style layout: processed-data/dt=YYYY-MM-DD/
+        for dt, partition_path in partition_files(df, clean_data_path):
+            s3_key = partition_key('processed-data', os.path.basename(partition_path), dt)
+            upload_to_s3(partition_path, bucket_name, s3_key)
         
         validate_data(df)
         
@@ -87,6 +182,8 @@ def main():
     
     except Exception as e:
         logger.error(f"Error during processing: {str(e)}")
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -4,7 +4,12 @@ import re
 import pandas as pd
 import great_expectations as ge
 from datetime import datetime
-from typing import Dict, Any
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+from sampling import should_sample, reservoir_sample, assess_sample, render_sample_section, whole_column_failures
+from storage import is_csv
+from handoff import has_handoff
+from schemas import read_dataset, read_options, coerce_columns, log_parse_failures
 
 # Logging configuration
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -12,23 +17,26 @@ logger = logging.getLogger(__name__)
 
 def get_latest_file(folder: str) -> str:
     """Gets the most recent CSV file in the specified directory."""
-    files = [f for f in os.listdir(folder) if f.endswith('.csv') and os.path.isfile(os.path.join(folder, f))]
+    files = [f for f in os.listdir(folder) if is_csv(f) and os.path.isfile(os.path.join(folder, f))]
     if not files:
         raise FileNotFoundError(f"No CSV files found in the folder: {folder}")
     return max(files, key=lambda f: os.path.getmtime(os.path.join(folder, f)))
 
 def load_and_prepare_data(file_path: str) -> pd.DataFrame:
-    """Loads and prepares data from the CSV."""
-    df = pd.read_csv(file_path)
-    df['idade'] = pd.to_numeric(df['idade'], errors='coerce')
-    df['salario'] = pd.to_numeric(df['salario'], errors='coerce')
+    """Loads and prepares data from the CSV, typed by the 'cleaned' schema."""
+    df, _ = read_dataset(file_path, 'cleaned')
     return df
 
-def validate_data(df: pd.DataFrame) -> Dict[str, Any]:
-    """Validates the data using Great Expectations."""
-    print(df)
-    gdf = ge.from_pandas(df)
-    
+def load_and_prepare_sample(file_path: str) -> Tuple[pd.DataFrame, int]:
+    """Loads and prepares a random sample of the CSV, returning it with the total number of rows."""
+    df, total_rows = reservoir_sample(file_path, **read_options('cleaned'))
+    df, parse_failures = coerce_columns(df, 'cleaned')
+    log_parse_failures(parse_failures, file_path)
+    return df, total_rows
+
+@lru_cache(maxsize=None)
+def get_expectation_suite() -> ge.core.ExpectationSuite:
+    """Builds the expectation suite once per process, so the daemon workers keep it warm."""
     # Create an expectation suite
     suite = ge.core.ExpectationSuite(expectation_suite_name="my_suite")
     
@@ -36,6 +44,7 @@ def validate_data(df: pd.DataFrame) -> Dict[str, Any]:
     suite.add_expectation(ge.core.ExpectationConfiguration(expectation_type="expect_column_to_exist", kwargs={"column": "id"}))
     suite.add_expectation(ge.core.ExpectationConfiguration(expectation_type="expect_column_values_to_be_of_type", kwargs={"column": "id", "type_": "int"}))
     suite.add_expectation(ge.core.ExpectationConfiguration(expectation_type="expect_column_values_to_not_be_null", kwargs={"column": "id"}))
+    suite.add_expectation(ge.core.ExpectationConfiguration(expectation_type="expect_column_values_to_be_unique", kwargs={"column": "id"}))
     suite.add_expectation(ge.core.ExpectationConfiguration(expectation_type="expect_column_to_exist", kwargs={"column": "idade"}))
     suite.add_expectation(ge.core.ExpectationConfiguration(expectation_type="expect_column_values_to_be_between", kwargs={"column": "idade", "min_value": 0, "max_value": 120}))
     suite.add_expectation(ge.core.ExpectationConfiguration(expectation_type="expect_column_to_exist", kwargs={"column": "salario"}))
@@ -43,14 +52,30 @@ def validate_data(df: pd.DataFrame) -> Dict[str, Any]:
     suite.add_expectation(ge.core.ExpectationConfiguration(expectation_type="expect_column_to_exist", kwargs={"column": "nome"}))
     suite.add_expectation(ge.core.ExpectationConfiguration(expectation_type="expect_column_values_to_not_be_null", kwargs={"column": "nome"}))
     
+    return suite
+
+def validate_data(df: pd.DataFrame) -> Dict[str, Any]:
+    """Validates the data using Great Expectations."""
+    print(df)
+    gdf = ge.from_pandas(df)
+    
+    suite = get_expectation_suite()
+    
     # Validate the data using the expectation suite
     results = gdf.validate(expectation_suite=suite, result_format="SUMMARY")
     
     
     return results
 
-def generate_html_report(results: Dict[str, Any], output_path: str):
-    """Generate an enhanced corporate layout HTML report."""
+def generate_html_report(results: Dict[str, Any], output_path: str, sample_assessment: Optional[Dict[str, Any]] = None,
+                         success: Optional[bool] = None):
+    """
+    Generate an enhanced corporate layout HTML report, with the sampling summary when validated on a sample.
+
+    The banner shows success, the outcome of the stage (the sample decision when it was accepted), or the results outcome when not given.
+    """
+    if success is None:
+        success = results['success']
     html_content = f"""
     <html lang="pt-BR">
     <head>
@@ -130,8 +155,8 @@ def generate_html_report(results: Dict[str, Any], output_path: str):
     <body>
         <div class="container">
             <h1>Relatório de Validação de Qualidade</h1>
-            <div class="status {'success' if results['success'] else 'failure'}">
-                {'✅ Todas as validações foram concluídas com sucesso!' if results['success'] else '❌ Foram encontrados problemas na validação dos dados.'}
+            <div class="status {'success' if success else 'failure'}">
+                {'✅ Todas as validações foram concluídas com sucesso!' if success else '❌ Foram encontrados problemas na validação dos dados.'}
             </div>
             <h2>Detalhes das Validações:</h2>
             {''.join(f'''
@@ -144,6 +169,7 @@ def generate_html_report(results: Dict[str, Any], output_path: str):
                 </ul>
             </div>
             ''' for expectation in results['results'])}
+            {render_sample_section(sample_assessment)}
             <div class="footer">
                 <p>Relatório gerado automaticamente em {datetime.now().strftime('%d/%m/%Y às %H:%M:%S')}</p>
             </div>
@@ -157,7 +183,9 @@ def generate_html_report(results: Dict[str, Any], output_path: str):
     
     logger.info(f"Enhanced corporate HTML report successfully generated: {output_path}")
 
-def main():
+def main(file_path: Optional[str] = None):
+    # A caller passing the file (the daemon) gets the error raised, so the next stages do not run on a failed one
+    raise_errors = file_path is not None
     try:
         # Configuration
         folder = 'arquivos'
@@ -165,30 +193,51 @@ def main():
         full_path = os.path.join(dir_path, folder)
         
         # Get the latest file
-        last_file = get_latest_file(full_path)
-        file_path = os.path.join(full_path, last_file)
+        if file_path is None:
+            last_file = get_latest_file(full_path)
+            file_path = os.path.join(full_path, last_file)
         
-        # Load and prepare the data
-        df = load_and_prepare_data(file_path)
+        # Validate a sample of large files as a fast gate, escalating to the full data when borderline.
+        # An Arrow handoff is loaded without parsing, so it is always validated in full.
+        sample_assessment = None
+        if should_sample(file_path) and not has_handoff(file_path):
+            df, total_rows = load_and_prepare_sample(file_path)
+            results = validate_data(df)
+            # Uniqueness cannot be estimated on a sample: it is counted on the full column
+            exact_failures = whole_column_failures(results, file_path, **read_options('cleaned'))
+            sample_assessment = assess_sample(results, len(df), total_rows, exact_failures)
+            if sample_assessment['escalar']:
+                logger.warning("Sample validation is borderline. Running the full validation.")
+                df = load_and_prepare_data(file_path)
+                results = validate_data(df)
+        else:
+            df = load_and_prepare_data(file_path)
+            results = validate_data(df)
         
-        # Validate the data
-        results = validate_data(df)
+        if sample_assessment is not None and not sample_assessment['escalar']:
+            success = sample_assessment['sucesso']
+        else:
+            success = results["success"]
 
         # Generate HTML report
         base_filename = os.path.splitext(os.path.basename(file_path))[0]
         end_name = re.findall(r'[0-9_]+', base_filename)
         report_path = os.path.join(full_path, f"clean_data_validation_report{end_name[-1]}.html")
-        generate_html_report(results, report_path)
+        generate_html_report(results, report_path, sample_assessment, success)
         
-        if not results["success"]:
+        if not success:
             logger.warning("Issues found in data quality validation. Report generated.")
         else:
             logger.info("No quality issues detected.")
         
     except FileNotFoundError as e:
         logger.error(f"File not found: {str(e)}")
+        if raise_errors:
+            raise
     except Exception as e:
         logger.error(f"Failed to process observability metrics: {str(e)}")
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     main()
@@ -2,8 +2,13 @@ import logging
 import os
 import re
 import pandas as pd
-import boto3
+from typing import Optional
 from botocore.exceptions import BotoCoreError, ClientError
+from schemas import read_dataset
+from handoff import write_handoff
+from lake import carry_partition_column, partition_files, partition_key
+from lookup import enrich_with_references
+from storage import compressed_path, csv_compression, get_s3_client, is_csv, upload_artifact
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -12,7 +17,7 @@ logger = logging.getLogger(__name__)
 def get_latest_file(folder: str) -> str:
     """Gets the latest CSV file in the specified directory."""
     try:
-        files = [f for f in os.listdir(folder) if f.endswith('.csv') and os.path.isfile(os.path.join(folder, f))]
+        files = [f for f in os.listdir(folder) if is_csv(f) and os.path.isfile(os.path.join(folder, f))]
         if not files:
             raise FileNotFoundError(f"No CSV files found in the folder: {folder}")
         return max(files, key=lambda f: os.path.getmtime(os.path.join(folder, f)))
@@ -39,7 +44,7 @@ def enrich_data(df: pd.DataFrame) -> pd.DataFrame:
 def save_to_csv(df: pd.DataFrame, file_path: str) -> None:
     """Saves the DataFrame to a CSV file."""
     try:
-        df.to_csv(file_path, index=False)
+        df.to_csv(file_path, index=False, compression=csv_compression(file_path))
         logger.info(f"Data saved to: {file_path}")
     except IOError as e:
         logger.error(f"Error saving CSV file: {str(e)}")
@@ -47,10 +52,10 @@ def save_to_csv(df: pd.DataFrame, file_path: str) -> None:
 
 def upload_to_s3(file_path: str, bucket_name: str, s3_key: str) -> None:
     """Uploads the file to S3."""
-    s3 = boto3.client('s3')
+    s3 = get_s3_client()
     try:
-        s3.upload_file(file_path, bucket_name, s3_key)
-        logger.info(f"File uploaded to S3: s3://{bucket_name}/{s3_key}")
+        if upload_artifact(s3, file_path, bucket_name, s3_key):
+            logger.info(f"File uploaded to S3: s3://{bucket_name}/{s3_key}")
     except (BotoCoreError, ClientError) as e:
         logger.error(f"Error uploading to S3: {str(e)}")
         raise
@@ -58,8 +63,12 @@ def upload_to_s3(file_path: str, bucket_name: str, s3_key: str) -> None:
 def process_data(file_path: str, bucket_name: str) -> pd.DataFrame:
     """Processes the data, enriches it, and uploads to S3."""
     try:
-        df = pd.read_csv(file_path)
+        # Keep the date column of PIPELINE_PARTITION_COLUMN for the partitioned upload
+        carry_partition_column('cleaned')
+        df, _ = read_dataset(file_path, 'cleaned')
         df_enriched = enrich_data(df)
+        # Columns of the reference tables (department, cost centre, region...) looked up by id
+        df_enriched = enrich_with_references(df_enriched)
         
         logger.info("Data enrichment completed and data sent to the Data Lake.")
         
@@ -70,7 +79,9 @@ def process_data(file_path: str, bucket_name: str) -> pd.DataFrame:
         raise
         raise
 
-def main():
+def main(file_path: Optional[str] = None):
+    # A caller passing the file (the daemon) gets the error raised, so the next stages do not run on a failed one
+    raise_errors = file_path is not None
     try:
         # Configuração
         bucket_name = 'data-lake-p6-890447484968'
@@ -79,8 +90,9 @@ def main():
         full_path = os.path.join(dir_path, folder)
         
         # Obter o arquivo mais recente
-        last_file = get_latest_file(full_path)
-        file_path = os.path.join(full_path, last_file)
+        if file_path is None:
+            last_file = get_latest_file(full_path)
+            file_path = os.path.join(full_path, last_file)
         
         # Processar dados
         df = process_data(file_path, bucket_name)
@@ -89,19 +101,26 @@ def main():
         base_filename = os.path.splitext(os.path.basename(file_path))[0]
         end_name = re.findall(r'[0-9_]+', base_filename)
         
-        clean_data_path = os.path.join(full_path, f"enriched_data{end_name[1]}.csv")
+        clean_data_path = compressed_path(os.path.join(full_path, f"enriched_data{end_name[1]}.csv"))
         
         save_to_csv(df, clean_data_path)
+        write_handoff(df, clean_data_path)
         
-        s3_key = f'enriched-data/enriched_data{end_name[1]}.csv'
-        upload_to_s3(clean_data_path, bucket_name, s3_key)
+        # Hive-style layout: enriched-data/dt=YYYY-MM-DD/
+        for dt, partition_path in partition_files(df, clean_data_path):
+            s3_key = partition_key('enriched-data', os.path.basename(partition_path), dt)
+            upload_to_s3(partition_path, bucket_name, s3_key)
         
         logger.info("Data enrichement completed and uploaded to the Data Lake.")
         
     except FileNotFoundError as e:
         logger.error(f"File not found: {str(e)}")
+        if raise_errors:
+            raise
     except Exception as e:
         logger.error(f"Failed to process observability metrics: {str(e)}")
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
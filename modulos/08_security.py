@@ -2,7 +2,11 @@ import logging
 import os
 import re
 import pandas as pd
-import boto3
+from typing import Optional
+from schemas import extend_schema, read_dataset
+from storage import compressed_path, csv_compression, get_s3_client, is_csv, upload_artifact
+from lake import carry_partition_column, partition_files, partition_key
+from lookup import reference_columns
 
 # Configuração de logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -11,7 +15,7 @@ logger = logging.getLogger(__name__)
 def get_latest_file(folder: str) -> str:
     """Gets the latest CSV file in the specified directory."""
     try:
-        files = [f for f in os.listdir(folder) if f.endswith('.csv') and os.path.isfile(os.path.join(folder, f))]
+        files = [f for f in os.listdir(folder) if is_csv(f) and os.path.isfile(os.path.join(folder, f))]
         if not files:
             raise FileNotFoundError(f"No CSV files found in the folder: {folder}")
         return max(files, key=lambda f: os.path.getmtime(os.path.join(folder, f)))
@@ -23,7 +27,10 @@ def load_and_prepare_data(file_path: str) -> pd.DataFrame:
     """Loads and prepares data from the CSV file."""
     try:
         """Loads and prepares data from the CSV file."""
-        df = pd.read_csv(file_path)
+        # Keep the columns added by the reference tables in 07_enrichment.py
+        extend_schema('enriched', reference_columns())
+        carry_partition_column('enriched')
+        df, _ = read_dataset(file_path, 'enriched')
         
         # Mascarar dados sensíveis (por exemplo, nome)
         df['nome_mascarado'] = df['nome'].apply(lambda x: x[0] + '*' * (len(x) - 1) if isinstance(x, str) else '')
@@ -38,16 +45,18 @@ def load_and_prepare_data(file_path: str) -> pd.DataFrame:
 
 def save_to_csv(df: pd.DataFrame, file_path: str) -> None:
     """Saves the DataFrame to a CSV file."""
-    df.to_csv(file_path, index=False)
+    df.to_csv(file_path, index=False, compression=csv_compression(file_path))
     logger.info(f"Data masking saved to: {file_path}")
 
 def upload_to_s3(file_path: str, bucket_name: str, s3_key: str) -> None:
     """Uploads the file to S3."""
-    s3 = boto3.client('s3')
-    s3.upload_file(file_path, bucket_name, s3_key)
-    logger.info(f"File uploaded to S3: s3://{bucket_name}/{s3_key}")
+    s3 = get_s3_client()
+    if upload_artifact(s3, file_path, bucket_name, s3_key):
+        logger.info(f"File uploaded to S3: s3://{bucket_name}/{s3_key}")
 
-def main():
+def main(file_path: Optional[str] = None):
+    # A caller passing the file (the daemon) gets the error raised, so the next stages do not run on a failed one
+    raise_errors = file_path is not None
     try:
         # Configuração
         bucket_name = 'data-lake-p6-890447484968'
@@ -56,8 +65,9 @@ def main():
         full_path = os.path.join(dir_path, folder)
         
         # Obter o arquivo mais recente
-        last_file = get_latest_file(full_path)
-        file_path = os.path.join(full_path, last_file)
+        if file_path is None:
+            last_file = get_latest_file(full_path)
+            file_path = os.path.join(full_path, last_file)
         
         df = load_and_prepare_data(file_path)
         
@@ -65,17 +75,21 @@ def main():
         base_filename = os.path.splitext(os.path.basename(file_path))[0]
         end_name = re.findall(r'[0-9_]+', base_filename)
         
-        clean_data_path = os.path.join(full_path, f"final_data{end_name[1]}.csv")
+        clean_data_path = compressed_path(os.path.join(full_path, f"final_data{end_name[1]}.csv"))
         
         save_to_csv(df, clean_data_path)
         
-        s3_key = f'governed-data/final_data{end_name[1]}.csv'
-        upload_to_s3(clean_data_path, bucket_name, s3_key)
+        # Hive-style layout: governed-data/dt=YYYY-MM-DD/
+        for dt, partition_path in partition_files(df, clean_data_path):
+            s3_key = partition_key('governed-data', os.path.basename(partition_path), dt)
+            upload_to_s3(partition_path, bucket_name, s3_key)
         
         logger.info("Data masking completed and file uploaded to the Data Lake.")
     
     except Exception as e:
         logger.error(f"Error during processing: {str(e)}")
+        if raise_errors:
+            raise
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
@@ -0,0 +1,74 @@
+import logging
+import os
+import sys
+import tempfile
+import time
+import pandas as pd
+from storage import is_csv
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+# Codecs and levels compared by the benchmark
+CODECS = [
+    ('none', None),
+    ('gzip-1', {'method': 'gzip', 'compresslevel': 1}),
+    ('gzip-6', {'method': 'gzip', 'compresslevel': 6}),
+    ('zstd-3', {'method': 'zstd', 'level': 3}),
+    ('zstd-10', {'method': 'zstd', 'level': 10})
+]
+
+def get_latest_file(folder: str) -> str:
+    """Gets the most recent CSV file in the specified directory."""
+    files = [f for f in os.listdir(folder) if is_csv(f) and os.path.isfile(os.path.join(folder, f))]
+    if not files:
+        raise FileNotFoundError(f"No CSV files found in the folder: {folder}")
+    return max(files, key=lambda f: os.path.getmtime(os.path.join(folder, f)))
+
+def benchmark_compression(df: pd.DataFrame, repeat: int = 3) -> pd.DataFrame:
+    """Measures the CPU time to write and read the DataFrame and the bytes written with each codec."""
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for name, compression in CODECS:
+            path = os.path.join(tmp_dir, f"benchmark_{name}.csv")
+            write_times, read_times = [], []
+            for _ in range(repeat):
+                start = time.process_time()
+                df.to_csv(path, index=False, compression=compression)
+                write_times.append(time.process_time() - start)
+
+                start = time.process_time()
+                pd.read_csv(path, compression=compression['method'] if compression else None)
+                read_times.append(time.process_time() - start)
+
+            rows.append({
+                'codec': name,
+                'bytes': os.path.getsize(path),
+                'cpu_escrita_s': min(write_times),
+                'cpu_leitura_s': min(read_times)
+            })
+
+    report = pd.DataFrame(rows)
+    report['taxa_compressao'] = report['bytes'].iloc[0] / report['bytes']
+    return report
+
+def main():
+    try:
+        if len(sys.argv) > 1:
+            file_path = sys.argv[1]
+        else:
+            dir_path = os.path.dirname(os.path.abspath(__file__))
+            full_path = os.path.join(dir_path, 'arquivos')
+            file_path = os.path.join(full_path, get_latest_file(full_path))
+
+        df = pd.read_csv(file_path)
+        logger.info(f"Benchmarking compression on {file_path} ({len(df)} rows)")
+        print(benchmark_compression(df).to_string(index=False))
+
+    except Exception as e:
+        logger.error(f"Compression benchmark failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    main()
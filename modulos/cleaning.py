@@ -0,0 +1,147 @@
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# JSON file with the cleaning rules, replacing CLEANING_RULES (set with PIPELINE_CLEANING_RULES)
+CLEANING_RULES_PATH = os.environ.get('PIPELINE_CLEANING_RULES')
+# Dataset of the rules applied by 05_quality_apply.py (set with PIPELINE_CLEANING_DATASET)
+CLEANING_DATASET = os.environ.get('PIPELINE_CLEANING_DATASET', 'processed')
+
+# Cleaning rules of each dataset, per column (a column with no rules, {}, is only kept as read):
+#   coerce: target numeric dtype ('int64' or 'float64'); unparsable values become nulls
+#   drop_if_null: drop the rows where the column is null
+#   clip: [lower, upper] bounds, null for no bound
+#   impute: 'mean', 'median' or {'constant': value}, computed after clipping
+#   round: number of decimals, applied after imputing
+CLEANING_RULES: Dict[str, Dict[str, Dict[str, Any]]] = {
+    'processed': {
+        'id': {'coerce': 'int64', 'drop_if_null': True},
+        'idade': {'coerce': 'float64', 'clip': [0, 120], 'impute': 'mean', 'round': 1},
+        'salario': {'coerce': 'float64', 'clip': [0, None], 'impute': 'mean'},
+        'nome': {'impute': {'constant': 'Unknown'}}
+    }
+}
+
+class CleaningPlan:
+    """
+    Cleaning rules of a dataset compiled into vectorized steps.
+
+    Each step runs once over all the columns it applies to: a single clip over the clipped columns,
+    a single mean and a single median over the imputed columns and a single fillna for every imputation.
+    The plan owns the coercion of the dataset: its columns are expected as read, without any conversion.
+    """
+
+    def __init__(self, rules: Dict[str, Dict[str, Any]]):
+        self.columns = list(rules)
+        self.coerce = {column: rule['coerce'] for column, rule in rules.items() if 'coerce' in rule}
+        self.drop_if_null = [column for column, rule in rules.items() if rule.get('drop_if_null')]
+
+        clipped = {column: rule['clip'] for column, rule in rules.items() if 'clip' in rule}
+        self.clip_columns = list(clipped)
+        self.clip_lower = pd.Series({c: -np.inf if b[0] is None else b[0] for c, b in clipped.items()}, dtype='float64')
+        self.clip_upper = pd.Series({c: np.inf if b[1] is None else b[1] for c, b in clipped.items()}, dtype='float64')
+
+        self.impute_mean = [column for column, rule in rules.items() if rule.get('impute') == 'mean']
+        self.impute_median = [column for column, rule in rules.items() if rule.get('impute') == 'median']
+        self.impute_constant = {
+            column: rule['impute']['constant'] for column, rule in rules.items()
+            if isinstance(rule.get('impute'), dict)
+        }
+        self.round = {column: rule['round'] for column, rule in rules.items() if 'round' in rule}
+
+        invalid = [c for c, r in rules.items() if r.get('impute') not in (None, 'mean', 'median') and not isinstance(r.get('impute'), dict)]
+        if invalid:
+            raise ValueError(f"Invalid impute rule for columns: {', '.join(invalid)}")
+
+    def filter(self, df: pd.DataFrame, checked: Sequence[str] = ()) -> Tuple[pd.DataFrame, pd.Series]:
+        """
+        Coerces the columns and drops the rows with nulls in the drop_if_null columns.
+
+        The input is not modified: the coerced columns are built as new Series and set only on the kept rows,
+        so the caller keeps the values as read (e.g. for the quarantine) without copying the frame.
+
+        Args:
+            df (pd.DataFrame): The data as read.
+            checked (Sequence[str]): Columns already known to hold only valid values (e.g. from a failure index):
+                they are converted without looking for unparsable values or nulls.
+
+        Returns:
+            Tuple[pd.DataFrame, pd.Series]: The kept rows and, indexed by the dropped rows, the null columns that dropped them.
+        """
+        coerced = {}
+        for column in self.coerce:
+            if column in checked and not pd.api.types.is_numeric_dtype(df[column]):
+                coerced[column] = pd.to_numeric(df[column])
+            elif not pd.api.types.is_numeric_dtype(df[column]):
+                values = pd.to_numeric(df[column], errors='coerce')
+                parse_failures = int((values.isna() & df[column].notna()).sum())
+                if parse_failures:
+                    logger.warning(f"{parse_failures} values of column '{column}' could not be parsed")
+                coerced[column] = values
+
+        null_columns = [column for column in self.drop_if_null if column not in checked]
+        null_mask = pd.DataFrame({column: coerced.get(column, df[column]).isna() for column in null_columns}, index=df.index)
+        dropped = null_mask.any(axis=1)
+        reasons = pd.Series(
+            [';'.join(null_mask.columns[row]) for row in null_mask[dropped].to_numpy()],
+            index=df.index[dropped], dtype=str
+        )
+
+        # take returns a new frame (not a view), so the columns below are set without copying it again
+        kept = np.flatnonzero(~dropped.to_numpy())
+        df = df.take(kept)
+        for column, values in coerced.items():
+            df[column] = values.take(kept)
+        self.cast(df)
+        return df, reasons
+
+    def transform(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Clips, imputes and rounds the columns."""
+        if self.clip_columns:
+            df[self.clip_columns] = df[self.clip_columns].clip(lower=self.clip_lower, upper=self.clip_upper, axis=1)
+
+        fill_values = dict(self.impute_constant)
+        if self.impute_mean:
+            fill_values.update(df[self.impute_mean].mean().to_dict())
+        if self.impute_median:
+            fill_values.update(df[self.impute_median].median().to_dict())
+        if fill_values:
+            df.fillna(fill_values, inplace=True)
+
+        if self.round:
+            round_columns = list(self.round)
+            df[round_columns] = df[round_columns].round(self.round)
+        self.cast(df)
+        return df
+
+    def cast(self, df: pd.DataFrame) -> None:
+        """Casts the coerced columns to their target dtype once they have no nulls left."""
+        for column, dtype in self.coerce.items():
+            if df[column].dtype != dtype and not df[column].isna().any():
+                df[column] = df[column].astype(dtype)
+
+    def apply(self, df: pd.DataFrame, checked: Sequence[str] = ()) -> Tuple[pd.DataFrame, pd.Series]:
+        """Runs the whole plan, returning the cleaned rows and the reasons of the dropped ones."""
+        df, reasons = self.filter(df, checked)
+        return self.transform(df), reasons
+
+def load_rules(path: Optional[str] = CLEANING_RULES_PATH) -> Dict[str, Dict[str, Dict[str, Any]]]:
+    """Loads the cleaning rules from a JSON file, or the default CLEANING_RULES when no file is configured."""
+    if not path:
+        return CLEANING_RULES
+    with open(path, encoding='utf-8') as f:
+        rules = json.load(f)
+    logger.info(f"Cleaning rules loaded from {path}")
+    return rules
+
+def compile_rules(dataset: str, rules: Optional[Dict[str, Dict[str, Dict[str, Any]]]] = None) -> CleaningPlan:
+    """Compiles the cleaning rules of a dataset into a CleaningPlan."""
+    rules = load_rules() if rules is None else rules
+    if dataset not in rules:
+        raise KeyError(f"No cleaning rules for dataset: {dataset}. Datasets with rules: {', '.join(rules)}")
+    return CleaningPlan(rules[dataset])
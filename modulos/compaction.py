@@ -0,0 +1,297 @@
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import tempfile
+import time
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+from storage import compressed_path, get_file_compression, get_s3_client, is_csv, open_artifact, upload_artifact
+from handoff import HANDOFF_FOLDER
+from lake import PARTITION_FOLDER, list_partitions
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DIR_PATH = os.path.dirname(os.path.abspath(__file__))
+# Folders with per-run artifacts, compacted into <folder>/compacted/<dataset>/
+LOCAL_FOLDERS = [os.path.join(DIR_PATH, 'arquivos'), os.path.join(DIR_PATH, 'arquivos', 'quarantine')]
+BUCKET_NAME = 'data-lake-p6-890447484968'
+S3_PREFIXES = ['raw-data', 'processed-data', 'quarantine-data', 'enriched-data', 'governed-data', 'observability']
+
+# Size of the compacted files
+TARGET_SIZE_MB = int(os.environ.get('PIPELINE_COMPACT_TARGET_MB', 128))
+# Runs newer than this, and the most recent KEEP_LATEST_RUNS runs, are never compacted
+MIN_AGE_DAYS = float(os.environ.get('PIPELINE_COMPACT_MIN_AGE_DAYS', 1))
+KEEP_LATEST_RUNS = 1
+# What happens to the compacted originals: 'archive' (moved to archive/) or 'delete'
+RETENTION_POLICY = os.environ.get('PIPELINE_RETENTION', 'archive').lower()
+
+COMPACTED_FOLDER = 'compacted'
+ARCHIVE_FOLDER = 'archive'
+INDEX_FILENAME = '_index.json'
+# Artifacts that are not merged, only archived or deleted with their run
+RETIRE_ONLY = ('validation_report', 'clean_data_validation_report', 'failure_index')
+
+# Most keys accepted by a single S3 delete_objects request
+DELETE_BATCH_SIZE = 1000
+
+ARTIFACT_PATTERN = re.compile(r'^(?P<dataset>[a-z_]+?)_(?P<run>\d{8}_\d{6})(?P<extension>\..+)$')
+
+def parse_artifact(filename: str) -> Optional[Tuple[str, str]]:
+    """Gets the dataset and the run timestamp of a per-run artifact name, or None for other files."""
+    match = ARTIFACT_PATTERN.match(filename)
+    if not match:
+        return None
+    return match.group('dataset'), match.group('run')
+
+def eligible_runs(runs: List[str], min_age_days: float = MIN_AGE_DAYS, keep_latest: int = KEEP_LATEST_RUNS) -> List[str]:
+    """Selects the runs old enough to be compacted, always keeping the latest ones."""
+    runs = sorted(set(runs))
+    candidates = runs[:-keep_latest] if keep_latest else runs
+    limit = time.strftime('%Y%m%d_%H%M%S', time.localtime(time.time() - min_age_days * 86400))
+    return [run for run in candidates if run <= limit]
+
+def batch_by_size(files: List[Tuple[str, str, int]], target_bytes: int) -> List[List[Tuple[str, str, int]]]:
+    """Groups (run, path, size) files, in run order, into batches of about target_bytes."""
+    batches, current, current_size = [], [], 0
+    for item in sorted(files):
+        if current and current_size + item[2] > target_bytes:
+            batches.append(current)
+            current, current_size = [], 0
+        current.append(item)
+        current_size += item[2]
+    if current:
+        batches.append(current)
+    return batches
+
+def merge_csv(sources: List[Tuple[str, str]], output_path: str) -> List[Dict[str, Any]]:
+    """
+    Appends the CSV files of several runs into one file, returning the runs it contains with their row ranges.
+
+    The compacted file has the union of the columns of all runs, in order of appearance, so no column
+    of any run is lost; columns missing from a run are left empty in its rows. Every value is read and
+    written as text, so the compacted file keeps the original values (leading zeros, integers with nulls,
+    number formats) of the originals it replaces.
+    """
+    columns = []
+    for _, path in sources:
+        header = pd.read_csv(path, compression=get_file_compression(path), nrows=0, dtype=str).columns
+        columns += [c for c in header if c not in columns]
+
+    runs, offset = [], 0
+    with open_artifact(output_path, 'wt') as output:
+        for run, path in sources:
+            df = pd.read_csv(path, compression=get_file_compression(path), dtype=str, keep_default_na=False)
+            df.reindex(columns=columns).to_csv(output, header=not runs, index=False)
+            runs.append({'execucao': run, 'inicio': offset, 'linhas': len(df)})
+            offset += len(df)
+    return runs
+
+def merge_json(sources: List[Tuple[str, str]], output_path: str) -> List[Dict[str, Any]]:
+    """Appends the JSON files of several runs into one JSON Lines file, one line per run."""
+    runs = []
+    with open_artifact(output_path, 'wt') as output:
+        for line, (run, path) in enumerate(sources):
+            with open_artifact(path, 'rt') as f:
+                metrics = json.load(f)
+            output.write(json.dumps({'execucao': run, 'metricas': metrics}) + '\n')
+            runs.append({'execucao': run, 'inicio': line, 'linhas': 1})
+    return runs
+
+def compacted_name(dataset: str, runs: List[str], extension: str) -> str:
+    """Names a compacted file after its dataset and its first and last runs."""
+    return os.path.basename(compressed_path(f"{dataset}_{runs[0]}__{runs[-1]}{extension}"))
+
+def update_index(index_path: str, entries: List[Dict[str, Any]]) -> None:
+    """Adds the compacted files to the index of a dataset folder."""
+    index = []
+    if os.path.isfile(index_path):
+        with open(index_path, encoding='utf-8') as f:
+            index = json.load(f)
+    index += entries
+    with open(index_path, 'w', encoding='utf-8') as f:
+        json.dump(index, f, indent=4)
+
+def retire_local(paths: List[str], folder: str, policy: str = RETENTION_POLICY) -> None:
+    """Archives or deletes compacted originals, according to the retention policy. Files in subfolders keep their relative path in archive/."""
+    for path in paths:
+        if policy == 'delete':
+            os.remove(path)
+        else:
+            archive_path = os.path.join(folder, ARCHIVE_FOLDER, os.path.relpath(path, folder))
+            os.makedirs(os.path.dirname(archive_path), exist_ok=True)
+            shutil.move(path, archive_path)
+    logger.info(f"{len(paths)} originals {'deleted' if policy == 'delete' else 'archived'} in {folder}")
+
+def compact_local_folder(folder: str, target_bytes: int = TARGET_SIZE_MB * 1024 * 1024) -> int:
+    """Compacts the per-run artifacts of a local folder, returning the number of files compacted."""
+    if not os.path.isdir(folder):
+        return 0
+
+    artifacts: Dict[str, List[Tuple[str, str, int]]] = {}
+    for filename in os.listdir(folder):
+        path = os.path.join(folder, filename)
+        parsed = parse_artifact(filename)
+        if parsed and os.path.isfile(path):
+            dataset, run = parsed
+            artifacts.setdefault(dataset, []).append((run, path, os.path.getsize(path)))
+
+    runs = eligible_runs([run for files in artifacts.values() for run, _, _ in files])
+    compacted = 0
+    for dataset, files in artifacts.items():
+        files = [item for item in files if item[0] in runs]
+        if not files:
+            continue
+        if dataset.startswith(RETIRE_ONLY):
+            retire_local([path for _, path, _ in files], folder)
+            continue
+
+        if len(files) < 2:
+            continue
+        is_json = not is_csv(files[0][1])
+        output_folder = os.path.join(folder, COMPACTED_FOLDER, dataset)
+        os.makedirs(output_folder, exist_ok=True)
+
+        entries = []
+        for batch in batch_by_size(files, target_bytes):
+            batch_runs = [run for run, _, _ in batch]
+            output_path = os.path.join(output_folder, compacted_name(dataset, batch_runs, '.jsonl' if is_json else '.csv'))
+            sources = [(run, path) for run, path, _ in batch]
+            merged_runs = merge_json(sources, output_path) if is_json else merge_csv(sources, output_path)
+            entries.append({'arquivo': os.path.basename(output_path), 'execucoes': merged_runs})
+            retire_local([path for _, path, _ in batch], folder)
+            compacted += len(batch)
+
+        update_index(os.path.join(output_folder, INDEX_FILENAME), entries)
+        logger.info(f"{dataset}: {len(files)} files compacted into {len(entries)} in {output_folder}")
+    return compacted
+
+def retire_local_copies(folder: str) -> int:
+    """
+    Applies the retention policy to the per-run copies of a folder that are never compacted, returning their number.
+
+    These are the Arrow handoffs (handoff/), disposable once the next stage has read them, and the
+    per-date copies uploaded to the Data Lake (partitions/dt=*/). The latest runs are kept, like in compaction.
+    """
+    subfolders = [os.path.join(folder, HANDOFF_FOLDER)]
+    subfolders += [os.path.join(folder, PARTITION_FOLDER, f"dt={dt}") for dt in list_partitions(os.path.join(folder, PARTITION_FOLDER))]
+    copies = []
+    for subfolder in subfolders:
+        if not os.path.isdir(subfolder):
+            continue
+        for filename in os.listdir(subfolder):
+            path = os.path.join(subfolder, filename)
+            parsed = parse_artifact(filename)
+            if parsed and os.path.isfile(path):
+                copies.append((parsed[1], path))
+
+    runs = eligible_runs([run for run, _ in copies])
+    paths = [path for run, path in copies if run in runs]
+    if paths:
+        retire_local(paths, folder)
+    return len(paths)
+
+def compact_s3_prefix(s3, bucket_name: str, prefix: str, target_bytes: int = TARGET_SIZE_MB * 1024 * 1024) -> int:
+    """
+    Compacts the per-run objects of each dt= partition of an S3 prefix, returning the number of objects compacted.
+
+    The latest runs are kept across the whole prefix, not per partition, so a partition no longer
+    written to is compacted entirely.
+    """
+    partitions: Dict[str, Dict[str, List[Tuple[str, str, int]]]] = {}
+    paginator = s3.get_paginator('list_objects_v2')
+    for dt in list_partitions(f"s3://{bucket_name}/{prefix}", s3):
+        partition = f"{prefix}/dt={dt}/"
+        objects = partitions.setdefault(partition, {})
+        for page in paginator.paginate(Bucket=bucket_name, Prefix=partition):
+            for obj in page.get('Contents', []):
+                parsed = parse_artifact(obj['Key'][len(partition):])
+                if parsed:
+                    dataset, run = parsed
+                    objects.setdefault(dataset, []).append((run, obj['Key'], obj['Size']))
+
+    runs = eligible_runs([run for objects in partitions.values() for items in objects.values() for run, _, _ in items])
+    compacted = 0
+    for partition, objects in partitions.items():
+        entries = []
+        for dataset, items in objects.items():
+            items = [item for item in items if item[0] in runs]
+            if len(items) < 2:
+                continue
+            is_json = not is_csv(items[0][1])
+            for batch in batch_by_size(items, target_bytes):
+                batch_runs = [run for run, _, _ in batch]
+                name = compacted_name(dataset, batch_runs, '.jsonl' if is_json else '.csv')
+                with tempfile.TemporaryDirectory() as tmp_dir:
+                    sources = []
+                    for run, key, _ in batch:
+                        local_path = os.path.join(tmp_dir, os.path.basename(key))
+                        s3.download_file(bucket_name, key, local_path)
+                        sources.append((run, local_path))
+                    output_path = os.path.join(tmp_dir, name)
+                    merged_runs = merge_json(sources, output_path) if is_json else merge_csv(sources, output_path)
+                    upload_artifact(s3, output_path, bucket_name, partition + name)
+                entries.append({'arquivo': name, 'execucoes': merged_runs})
+                retire_s3(s3, bucket_name, [key for _, key, _ in batch])
+                compacted += len(batch)
+
+        if entries:
+            index_key = partition + INDEX_FILENAME
+            index = []
+            try:
+                index = json.load(s3.get_object(Bucket=bucket_name, Key=index_key)['Body'])
+            except s3.exceptions.NoSuchKey:
+                pass
+            s3.put_object(Bucket=bucket_name, Key=index_key, Body=json.dumps(index + entries, indent=4).encode('utf-8'),
+                          ContentType='application/json')
+            logger.info(f"s3://{bucket_name}/{partition}: {sum(len(e['execucoes']) for e in entries)} runs compacted into {len(entries)} files")
+    return compacted
+
+def retire_s3(s3, bucket_name: str, keys: List[str], policy: str = RETENTION_POLICY) -> None:
+    """
+    Archives (copies to archive/) or deletes compacted objects, according to the retention policy.
+
+    delete_objects takes at most DELETE_BATCH_SIZE keys per request and reports the keys it could not
+    delete in Errors instead of failing, so the keys are deleted in batches and any error is raised.
+    """
+    if policy != 'delete':
+        for key in keys:
+            s3.copy_object(Bucket=bucket_name, Key=f"{ARCHIVE_FOLDER}/{key}", CopySource={'Bucket': bucket_name, 'Key': key})
+    for start in range(0, len(keys), DELETE_BATCH_SIZE):
+        batch = keys[start:start + DELETE_BATCH_SIZE]
+        response = s3.delete_objects(Bucket=bucket_name, Delete={'Objects': [{'Key': key} for key in batch]})
+        errors = response.get('Errors', [])
+        if errors:
+            details = ', '.join(f"{error['Key']} ({error.get('Code')}: {error.get('Message')})" for error in errors)
+            raise RuntimeError(f"Failed to delete {len(errors)} compacted objects from {bucket_name}: {details}")
+
+def main():
+    try:
+        target = sys.argv[1] if len(sys.argv) > 1 else 'all'
+        if target not in ('local', 's3', 'all'):
+            raise ValueError("Usage: python compaction.py [local|s3|all]")
+        if RETENTION_POLICY not in ('archive', 'delete'):
+            raise ValueError(f"Invalid retention policy: {RETENTION_POLICY}. Use 'archive' or 'delete'.")
+
+        if target in ('local', 'all'):
+            for folder in LOCAL_FOLDERS:
+                compact_local_folder(folder)
+                retire_local_copies(folder)
+
+        if target in ('s3', 'all'):
+            s3 = get_s3_client()
+            for prefix in S3_PREFIXES:
+                compact_s3_prefix(s3, BUCKET_NAME, prefix)
+
+        logger.info("Compaction completed.")
+
+    except Exception as e:
+        logger.error(f"Compaction failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,123 @@
+import logging
+import os
+import sys
+import tempfile
+import numpy as np
+import pandas as pd
+from typing import Optional, Tuple
+from storage import open_artifact
+
+logger = logging.getLogger(__name__)
+
+# Which row survives among rows sharing the same key: 'first' or 'latest'
+DEDUP_KEEP = 'first'
+DEDUP_KEY = 'id'
+# Number of spill files of the out-of-core deduplication; each one must fit in memory
+DEDUP_PARTITIONS = 64
+CHUNK_SIZE = 500_000
+
+def duplicated_mask(df: pd.DataFrame, key: str = DEDUP_KEY, keep: str = DEDUP_KEEP,
+                    order_by: Optional[str] = None) -> pd.Series:
+    """
+    Flags the rows to drop among rows sharing the same key.
+
+    'first' keeps the first row in file order. 'latest' keeps the row with the highest order_by value,
+    or the last row in file order when order_by is not given. Rows with a null key are never flagged.
+    """
+    if keep not in ('first', 'latest'):
+        raise ValueError(f"Invalid keep: {keep}. Use 'first' or 'latest'.")
+
+    if keep == 'first':
+        mask = df.duplicated(subset=[key], keep='first')
+    elif order_by is None:
+        mask = df.duplicated(subset=[key], keep='last')
+    else:
+        ordered = df.sort_values(order_by, kind='stable')
+        mask = ordered.duplicated(subset=[key], keep='last').reindex(df.index)
+    return mask & df[key].notna()
+
+def deduplicate(df: pd.DataFrame, key: str = DEDUP_KEY, keep: str = DEDUP_KEEP,
+                order_by: Optional[str] = None) -> Tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Removes the rows with a duplicated key from a DataFrame, returning the kept and the dropped rows.
+
+    Both are new frames (taken by position, not views), so their columns can be set without another copy.
+    """
+    mask = duplicated_mask(df, key, keep, order_by).to_numpy()
+    if mask.any():
+        logger.warning(f"{int(mask.sum())} rows with duplicated '{key}' removed (keep={keep}).")
+    return df.take(np.flatnonzero(~mask)), df.take(np.flatnonzero(mask))
+
+def normalized_key(values: pd.Series) -> pd.Series:
+    """
+    Gets a text form of the key that does not depend on the dtype inferred for each chunk.
+
+    Numeric keys are written as floats, so 7, 7.0 and "7" get the same value even when a null in one chunk
+    makes pandas read its keys as float64. Other keys keep their text; null keys stay null.
+    """
+    numeric = pd.to_numeric(values, errors='coerce')
+    return values.astype(str).where(numeric.isna(), numeric.astype('float64').astype(str)).where(values.notna())
+
+def deduplicate_file(input_path: str, output_path: str, key: str = DEDUP_KEY, keep: str = DEDUP_KEEP,
+                     order_by: Optional[str] = None, partitions: int = DEDUP_PARTITIONS,
+                     chunksize: int = CHUNK_SIZE) -> int:
+    """
+    Deduplicates a CSV file larger than memory.
+
+    The rows are streamed in chunks and spilled to temporary files partitioned by the hash of the normalized key,
+    so all rows sharing a key land in the same partition. Each partition is then deduplicated in memory
+    and appended to the output. The output is grouped by partition: the file order is kept within each
+    partition, but not across them.
+
+    Returns:
+        int: The number of rows removed.
+    """
+    removed = 0
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        spill_paths = [os.path.join(tmp_dir, f"particao_{i}.csv") for i in range(partitions)]
+
+        # Spill: route every row to the partition of its key
+        position = 0
+        # The key is read as text so the output keeps it as written in the input
+        for chunk in pd.read_csv(input_path, chunksize=chunksize, dtype={key: str}):
+            chunk['_posicao'] = np.arange(position, position + len(chunk))
+            chunk['_chave'] = normalized_key(chunk[key])
+            position += len(chunk)
+            buckets = pd.util.hash_pandas_object(chunk['_chave'], index=False).to_numpy() % partitions
+            for bucket, part in chunk.groupby(buckets):
+                spill_path = spill_paths[bucket]
+                part.to_csv(spill_path, mode='a', header=not os.path.exists(spill_path), index=False)
+
+        # Deduplicate each partition in memory
+        header = True
+        with open_artifact(output_path, 'wt') as output:
+            for spill_path in spill_paths:
+                if not os.path.exists(spill_path):
+                    continue
+                part = pd.read_csv(spill_path, dtype={key: str, '_chave': str})
+                kept, dropped = deduplicate(part.sort_values('_posicao'), '_chave', keep, order_by)
+                removed += len(dropped)
+                kept.drop(columns=['_posicao', '_chave']).to_csv(output, header=header, index=False)
+                header = False
+
+    if header:
+        raise ValueError(f"No rows found in the file: {input_path}")
+
+    logger.info(f"Deduplicated {position} rows of {input_path} into {output_path}: {removed} duplicates removed.")
+    return removed
+
+def main():
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    try:
+        if len(sys.argv) < 3:
+            raise ValueError("Usage: python dedup.py <input.csv> <output.csv> [first|latest] [order_by]")
+        keep = sys.argv[3] if len(sys.argv) > 3 else DEDUP_KEEP
+        order_by = sys.argv[4] if len(sys.argv) > 4 else None
+        deduplicate_file(sys.argv[1], sys.argv[2], keep=keep, order_by=order_by)
+
+    except Exception as e:
+        logger.error(f"Deduplication failed: {str(e)}")
+        raise
+
+if __name__ == "__main__":
+    main()
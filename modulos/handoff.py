@@ -0,0 +1,65 @@
+import logging
+import os
+import pandas as pd
+from typing import List, Optional, Sequence
+from storage import strip_compression
+
+logger = logging.getLogger(__name__)
+
+# Intermediate format between the stages: 'csv' (default) or 'arrow' (set with PIPELINE_HANDOFF)
+HANDOFF_FORMAT = os.environ.get('PIPELINE_HANDOFF', 'csv').lower()
+HANDOFF_FOLDER = 'handoff'
+
+def handoff_path(csv_path: str) -> str:
+    """Gets the Arrow IPC handoff path of a CSV artifact (in the handoff subfolder, so it is never taken as the latest CSV)."""
+    folder, filename = os.path.split(strip_compression(csv_path))
+    return os.path.join(folder, HANDOFF_FOLDER, os.path.splitext(filename)[0] + '.arrow')
+
+def has_handoff(csv_path: str) -> bool:
+    """Checks if a CSV artifact has an Arrow IPC handoff file at least as new as the CSV."""
+    path = handoff_path(csv_path)
+    if not os.path.isfile(path):
+        return False
+    return not os.path.isfile(csv_path) or os.path.getmtime(path) >= os.path.getmtime(csv_path)
+
+def write_handoff(df: pd.DataFrame, csv_path: str) -> None:
+    """Writes the DataFrame as an uncompressed Arrow IPC file next to its CSV artifact, when the arrow handoff is enabled."""
+    if HANDOFF_FORMAT != 'arrow':
+        return
+    import pyarrow as pa
+
+    path = handoff_path(csv_path)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    with pa.OSFile(path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    logger.info(f"Arrow handoff saved to: {path}")
+
+def read_handoff(csv_path: str, columns: Optional[List[str]] = None,
+                 optional_columns: Sequence[str] = ()) -> Optional[pd.DataFrame]:
+    """
+    Reads the Arrow IPC handoff of a CSV artifact, if present and current.
+
+    The handoff is ignored when it is older than the CSV (the CSV was rewritten, e.g. by a re-run without
+    the arrow handoff) or when it lacks any of the columns; optional_columns are kept only when present. The file is memory-mapped and converted with
+    split_blocks, so numeric columns without nulls are wrapped without copies and nothing is parsed.
+    """
+    path = handoff_path(csv_path)
+    if not os.path.isfile(path):
+        return None
+    if not has_handoff(csv_path):
+        logger.warning(f"Arrow handoff older than its CSV, ignoring it: {path}")
+        return None
+    import pyarrow as pa
+
+    # The buffers of the table keep the mapping alive
+    table = pa.ipc.open_file(pa.memory_map(path, 'r')).read_all()
+    if columns is not None:
+        missing = [column for column in columns if column not in table.column_names]
+        if missing:
+            logger.warning(f"Arrow handoff {path} lacks the columns {', '.join(missing)}, ignoring it.")
+            return None
+        table = table.select(columns + [column for column in optional_columns if column in table.column_names])
+    logger.info(f"Reading Arrow handoff: {path}")
+    return table.to_pandas(split_blocks=True)
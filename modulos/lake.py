@@ -0,0 +1,131 @@
+import io
+import logging
+import os
+import re
+import pandas as pd
+from datetime import datetime
+from typing import List, Optional, Tuple
+from storage import csv_compression, get_file_compression, get_s3_client
+from schemas import extend_schema, read_options
+
+logger = logging.getLogger(__name__)
+
+# Optional date column of the data used as partition instead of the run date (set with PIPELINE_PARTITION_COLUMN)
+PARTITION_COLUMN = os.environ.get('PIPELINE_PARTITION_COLUMN')
+PARTITION_FOLDER = 'partitions'
+DEFAULT_PARTITION = '__HIVE_DEFAULT_PARTITION__'
+
+def run_date(file_path: str) -> str:
+    """Gets the run date (YYYY-MM-DD) from the timestamp of an artifact name, or today when there is none."""
+    match = re.search(r'(\d{8})_\d{6}', os.path.basename(file_path))
+    if match:
+        return datetime.strptime(match.group(1), '%Y%m%d').strftime('%Y-%m-%d')
+    return datetime.now().strftime('%Y-%m-%d')
+
+def partition_key(prefix: str, filename: str, dt: str) -> str:
+    """Builds the Hive-style S3 key of an artifact: <prefix>/dt=<YYYY-MM-DD>/<filename>."""
+    return f"{prefix.rstrip('/')}/dt={dt}/{filename}"
+
+def carry_partition_column(dataset: str, partition_column: Optional[str] = PARTITION_COLUMN) -> None:
+    """Adds the partition column to the schema of a dataset as optional, so the stages keep it when the data has it."""
+    if partition_column:
+        extend_schema(dataset, [partition_column], optional=True)
+
+def partition_files(df: pd.DataFrame, file_path: str, partition_column: Optional[str] = PARTITION_COLUMN) -> List[Tuple[str, str]]:
+    """
+    Gets the (dt, local path) of the files to upload for an artifact already saved at file_path.
+
+    Without a partition column the whole file goes to the partition of the run date. With one, the rows
+    are split by the date of that column into files under arquivos/partitions/dt=<date>/.
+    """
+    if not partition_column:
+        return [(run_date(file_path), file_path)]
+    if partition_column not in df.columns:
+        logger.warning(f"Partition column '{partition_column}' not in {file_path}, using the run date.")
+        return [(run_date(file_path), file_path)]
+
+    dates = pd.to_datetime(df[partition_column], errors='coerce').dt.strftime('%Y-%m-%d').fillna(DEFAULT_PARTITION)
+    folder, filename = os.path.split(file_path)
+    files = []
+    for dt, part in df.groupby(dates):
+        part_path = os.path.join(folder, PARTITION_FOLDER, f"dt={dt}", filename)
+        os.makedirs(os.path.dirname(part_path), exist_ok=True)
+        part.to_csv(part_path, index=False, compression=csv_compression(part_path))
+        files.append((dt, part_path))
+    logger.info(f"{file_path} split into {len(files)} partitions by '{partition_column}'.")
+    return files
+
+def split_s3_uri(uri: str) -> Tuple[str, str]:
+    """Splits s3://bucket/prefix into bucket and prefix."""
+    bucket, _, prefix = uri[len('s3://'):].partition('/')
+    return bucket, prefix.rstrip('/')
+
+def in_range(dt: str, start_date: Optional[str], end_date: Optional[str]) -> bool:
+    """Checks if a partition date is within the inclusive range (ISO dates compare as strings)."""
+    return (start_date is None or dt >= start_date) and (end_date is None or dt <= end_date)
+
+def list_partitions(root: str, s3=None) -> List[str]:
+    """Lists the partition dates under a local folder or an s3:// prefix, without listing the files. s3 defaults to get_s3_client()."""
+    if root.startswith('s3://'):
+        bucket, prefix = split_s3_uri(root)
+        paginator = (s3 or get_s3_client()).get_paginator('list_objects_v2')
+        partitions = []
+        for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/dt=", Delimiter='/'):
+            partitions += [p['Prefix'].rstrip('/').split('dt=', 1)[1] for p in page.get('CommonPrefixes', [])]
+        return sorted(partitions)
+    if not os.path.isdir(root):
+        return []
+    return sorted(d[len('dt='):] for d in os.listdir(root) if d.startswith('dt=') and os.path.isdir(os.path.join(root, d)))
+
+def pruned_files(root: str, start_date: Optional[str] = None, end_date: Optional[str] = None, s3=None) -> List[str]:
+    """Lists the data files of the partitions within the date range, skipping the other partitions entirely and metadata files such as _index.json."""
+    partitions = [dt for dt in list_partitions(root, s3) if in_range(dt, start_date, end_date)]
+    files = []
+    if root.startswith('s3://'):
+        bucket, prefix = split_s3_uri(root)
+        paginator = (s3 or get_s3_client()).get_paginator('list_objects_v2')
+        for dt in partitions:
+            for page in paginator.paginate(Bucket=bucket, Prefix=f"{prefix}/dt={dt}/"):
+                files += [f"s3://{bucket}/{obj['Key']}" for obj in page.get('Contents', [])
+                          if not os.path.basename(obj['Key']).startswith('_')]
+    else:
+        for dt in partitions:
+            folder = os.path.join(root, f"dt={dt}")
+            files += [os.path.join(folder, f) for f in sorted(os.listdir(folder))
+                      if os.path.isfile(os.path.join(folder, f)) and not f.startswith('_')]
+    return files
+
+def read_partitions(root: str, start_date: Optional[str] = None, end_date: Optional[str] = None,
+                    dataset: Optional[str] = None) -> pd.DataFrame:
+    """
+    Reads the CSV files of a partitioned dataset within a date range.
+
+    Args:
+        root (str): Local folder or s3:// prefix holding the dt=YYYY-MM-DD partitions.
+        start_date (Optional[str]): First date (YYYY-MM-DD), inclusive.
+        end_date (Optional[str]): Last date (YYYY-MM-DD), inclusive.
+        dataset (Optional[str]): Schema of the files in SCHEMAS, for typed parsing. All the columns of each file
+            are read (the files may have reference or partition columns not in the schema); the schema
+            only sets the dtypes of its columns.
+
+    Returns:
+        pd.DataFrame: The rows of the selected partitions, with a dt column.
+    """
+    options = {'dtype': read_options(dataset)['dtype']} if dataset else {}
+    s3 = get_s3_client() if root.startswith('s3://') else None
+    frames = []
+    for path in pruned_files(root, start_date, end_date, s3):
+        dt = re.search(r'dt=([^/\\]+)', path).group(1)
+        compression = get_file_compression(path)
+        if s3 is not None:
+            bucket, key = split_s3_uri(path)
+            body = s3.get_object(Bucket=bucket, Key=key)['Body'].read()
+            df = pd.read_csv(io.BytesIO(body), compression=compression, **options)
+        else:
+            df = pd.read_csv(path, compression=compression, **options)
+        frames.append(df.assign(dt=dt))
+
+    logger.info(f"{len(frames)} files read from {root} between {start_date or '-'} and {end_date or '-'}.")
+    if not frames:
+        return pd.DataFrame()
+    return pd.concat(frames, ignore_index=True)
@@ -0,0 +1,138 @@
+import json
+import logging
+import os
+import numpy as np
+import pandas as pd
+from typing import Any, Dict, List, Optional
+from schemas import ENGINE
+from storage import file_fingerprint
+
+logger = logging.getLogger(__name__)
+
+DIR_PATH = os.path.dirname(os.path.abspath(__file__))
+# JSON file listing the reference tables joined by 07_enrichment.py (set with PIPELINE_REFERENCE_TABLES):
+#   [{"name": "departamento", "path": "referencias/departamento.csv", "key": "id", "columns": ["departamento"]}]
+REFERENCE_TABLES_PATH = os.environ.get('PIPELINE_REFERENCE_TABLES')
+# Sorted reference indexes kept between runs
+INDEX_FOLDER = os.path.join(DIR_PATH, 'arquivos', 'indices')
+
+def load_reference_tables(path: Optional[str] = REFERENCE_TABLES_PATH) -> List[Dict[str, Any]]:
+    """Loads the reference tables configuration; relative paths are resolved from the modulos folder."""
+    if not path:
+        return []
+    with open(path, encoding='utf-8') as f:
+        references = json.load(f)
+    for reference in references:
+        reference['path'] = os.path.join(DIR_PATH, reference['path'])
+        reference.setdefault('key', 'id')
+    return references
+
+def reference_columns(references: Optional[List[Dict[str, Any]]] = None) -> List[str]:
+    """Lists the columns added by the reference tables."""
+    references = load_reference_tables() if references is None else references
+    return [column for reference in references for column in reference['columns']]
+
+class ReferenceIndex:
+    """
+    Reference table sorted by its key and stored as an Arrow IPC file.
+
+    The file is memory-mapped, so opening the index costs nothing. Lookups use a binary search over
+    the sorted keys and gather the matching rows, with no hash table or merge built in memory.
+    """
+
+    def __init__(self, name: str, index_path: str, key: str):
+        import pyarrow as pa
+
+        self.name = name
+        self.key = key
+        self.table = pa.ipc.open_file(pa.memory_map(index_path, 'r')).read_all()
+        self.keys = self.table.column(key).to_numpy()
+        self.values = self.table.drop_columns([key])
+
+    def lookup(self, keys: np.ndarray) -> pd.DataFrame:
+        """Gets the reference columns of each key, with nulls for keys not found."""
+        import pyarrow as pa
+
+        if len(self.keys) == 0:
+            return pd.DataFrame(index=range(len(keys)), columns=self.values.column_names)
+        positions = np.minimum(np.searchsorted(self.keys, keys), len(self.keys) - 1)
+        found = self.keys[positions] == keys
+        return self.values.take(pa.array(positions, mask=~found)).to_pandas()
+
+def temporary_path(path: str) -> str:
+    """Gets a per-process temporary path next to path, replaced onto it once fully written."""
+    return f"{path}.{os.getpid()}.tmp"
+
+def build_index(reference: Dict[str, Any], index_path: str) -> None:
+    """
+    Reads the reference table once, keeps one row per key, sorts it by key and writes the Arrow index.
+
+    The index is written to a temporary file and moved onto index_path with os.replace, so a daemon worker
+    opening it at the same time sees either the previous or the new index, never a partial one.
+    """
+    import pyarrow as pa
+
+    key = reference['key']
+    df = pd.read_csv(reference['path'], engine=ENGINE, usecols=[key] + reference['columns'])
+
+    df[key] = pd.to_numeric(df[key], errors='coerce')
+    df = df.dropna(subset=[key])
+    duplicates = int(df[key].duplicated().sum())
+    if duplicates:
+        logger.warning(f"Reference '{reference['name']}' has {duplicates} duplicated keys. Keeping the first row of each.")
+        df = df.drop_duplicates(subset=[key])
+    df[key] = df[key].astype('int64')
+    df = df.sort_values(key)
+
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    tmp_path = temporary_path(index_path)
+    with pa.OSFile(tmp_path, 'wb') as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    os.replace(tmp_path, index_path)
+    logger.info(f"Reference index '{reference['name']}' built with {len(df)} keys: {index_path}")
+
+def get_reference_index(reference: Dict[str, Any]) -> ReferenceIndex:
+    """Opens the index of a reference table, rebuilding it only when the source file changed."""
+    os.makedirs(INDEX_FOLDER, exist_ok=True)
+    index_path = os.path.join(INDEX_FOLDER, f"{reference['name']}.arrow")
+    meta_path = os.path.join(INDEX_FOLDER, f"{reference['name']}.json")
+
+    meta = {'source': reference['path'], 'key': reference['key'], 'columns': reference['columns'],
+            **file_fingerprint(reference['path'])}
+    stored_meta = None
+    if os.path.isfile(meta_path) and os.path.isfile(index_path):
+        with open(meta_path, encoding='utf-8') as f:
+            stored_meta = json.load(f)
+
+    if stored_meta != meta:
+        # The metadata is replaced after the index, so it never describes an index not yet written
+        build_index(reference, index_path)
+        tmp_path = temporary_path(meta_path)
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(meta, f, indent=4)
+        os.replace(tmp_path, meta_path)
+    else:
+        logger.info(f"Reference index '{reference['name']}' is up to date: {index_path}")
+
+    return ReferenceIndex(reference['name'], index_path, reference['key'])
+
+def enrich_with_references(df: pd.DataFrame, references: Optional[List[Dict[str, Any]]] = None) -> pd.DataFrame:
+    """
+    Adds the columns of each reference table to the DataFrame, looking all its keys up at once.
+
+    Only the reference tables are memory-mapped: the DataFrame and the looked-up columns are held in memory,
+    like the data of every other stage.
+    """
+    references = load_reference_tables() if references is None else references
+    for reference in references:
+        index = get_reference_index(reference)
+        keys = pd.to_numeric(df[index.key], errors='coerce').to_numpy()
+        values = index.lookup(keys)
+        values.index = df.index
+
+        matched = int(values.notna().any(axis=1).sum()) if len(values.columns) else 0
+        logger.info(f"Reference '{reference['name']}': {matched} of {len(df)} rows matched.")
+        for column in values.columns:
+            df[column] = values[column]
+    return df
@@ -0,0 +1,212 @@
+import importlib.util
+import logging
+import os
+import re
+import shutil
+import signal
+import time
+from concurrent.futures import Future, ProcessPoolExecutor
+from types import ModuleType
+from typing import Callable, Dict, List, Set
+from storage import compressed_path, is_csv
+
+try:
+    from inotify_simple import INotify, flags
+except ImportError:
+    INotify = None
+
+# Logging configuration
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+DIR_PATH = os.path.dirname(os.path.abspath(__file__))
+WATCH_FOLDER = os.path.join(DIR_PATH, 'arquivos')
+# Optional queue folder: files dropped there are moved to arquivos/ before processing
+QUEUE_FOLDER = os.environ.get('PIPELINE_QUEUE_DIR')
+WORKERS = int(os.environ.get('PIPELINE_WORKERS', 2))
+POLL_INTERVAL = float(os.environ.get('PIPELINE_POLL_INTERVAL', 2))
+
+# Stages run on each new raw file, with the artifact each one reads
+STAGES = [
+    ('02-upload_file_s3.py', 'processed_data'),
+    ('03_observability.py', 'processed_data'),
+    ('04_validates_raw_data_quality.py', 'processed_data'),
+    ('05_quality_apply.py', 'processed_data'),
+    ('06_validates_clean_data_quality.py', 'cleaned_data'),
+    ('07_enrichment.py', 'cleaned_data'),
+    ('08_security.py', 'enriched_data')
+]
+# Artifact written by the last stage: a raw file with it has already been governed
+FINAL_DATASET = 'final_data'
+
+# Stage modules loaded once per worker process
+_stages: Dict[str, ModuleType] = {}
+
+def is_raw_file(filename: str) -> bool:
+    """Checks if the file is a raw file produced by 01-data-generate.py."""
+    return filename.startswith('processed_data_') and is_csv(filename)
+
+def artifact_path(dataset: str, raw_path: str) -> str:
+    """Gets the path of the artifact of a dataset produced from a raw file (same timestamp suffix)."""
+    base_filename = os.path.splitext(os.path.basename(raw_path))[0]
+    end_name = re.findall(r'[0-9_]+', base_filename)
+    return compressed_path(os.path.join(WATCH_FOLDER, f"{dataset}{end_name[1]}.csv"))
+
+def is_processed(raw_path: str) -> bool:
+    """Checks if every stage already ran on a raw file."""
+    return os.path.isfile(artifact_path(FINAL_DATASET, raw_path))
+
+def load_stage(script: str) -> ModuleType:
+    """Imports a stage script (their names are not valid module names) as a module."""
+    spec = importlib.util.spec_from_file_location(os.path.splitext(script)[0].replace('-', '_'), os.path.join(DIR_PATH, script))
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+def init_worker() -> None:
+    """Warms a worker up: imports pandas, boto3 and great_expectations with the stage modules and builds the expectation suites once."""
+    os.chdir(DIR_PATH)
+    # The parent handles the shutdown signals
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    for script, _ in STAGES:
+        _stages[script] = load_stage(script)
+        if hasattr(_stages[script], 'get_expectation_suite'):
+            _stages[script].get_expectation_suite()
+    logger.info(f"Worker {os.getpid()} ready with {len(_stages)} stages loaded.")
+
+def process_file(file_path: str) -> float:
+    """
+    Runs every stage on a raw file inside a warm worker, returning the elapsed time in seconds.
+
+    The stages raise their errors when given the file, so a failed stage stops the file and fails the future.
+    """
+    start = time.perf_counter()
+
+    for script, dataset in STAGES:
+        stage_input = file_path if dataset == 'processed_data' else artifact_path(dataset, file_path)
+        if not os.path.isfile(stage_input):
+            raise FileNotFoundError(f"{script} input not found: {stage_input}")
+
+        stage_start = time.perf_counter()
+        _stages[script].main(stage_input)
+        logger.info(f"{script} finished in {time.perf_counter() - stage_start:.2f}s for {os.path.basename(file_path)}")
+
+    return time.perf_counter() - start
+
+def scan_folder(folder: str) -> Dict[str, int]:
+    """Lists the raw files of a folder with their sizes."""
+    with os.scandir(folder) as entries:
+        return {entry.path: entry.stat().st_size for entry in entries if entry.is_file() and is_raw_file(entry.name)}
+
+class PollingWatcher:
+    """Detects new raw files by listing the folder; a file is ready when its size is stable between two scans."""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.seen: Set[str] = set(scan_folder(folder))
+        self.pending: Dict[str, int] = {}
+
+    def poll(self, timeout: float) -> List[str]:
+        time.sleep(timeout)
+        ready = []
+        for path, size in scan_folder(self.folder).items():
+            if path in self.seen:
+                continue
+            if self.pending.get(path) == size:
+                ready.append(path)
+                self.seen.add(path)
+                del self.pending[path]
+            else:
+                self.pending[path] = size
+        return sorted(ready)
+
+class InotifyWatcher:
+    """Detects new raw files with inotify, when a file is closed after writing or moved into the folder."""
+
+    def __init__(self, folder: str):
+        self.folder = folder
+        self.inotify = INotify()
+        self.inotify.add_watch(folder, flags.CLOSE_WRITE | flags.MOVED_TO)
+
+    def poll(self, timeout: float) -> List[str]:
+        events = self.inotify.read(timeout=int(timeout * 1000))
+        return sorted({os.path.join(self.folder, event.name) for event in events if is_raw_file(event.name)})
+
+def create_watcher(folder: str):
+    """Creates an inotify watcher, falling back to polling when inotify is not available."""
+    if INotify is not None:
+        try:
+            watcher = InotifyWatcher(folder)
+            logger.info(f"Watching {folder} with inotify.")
+            return watcher
+        except OSError as e:
+            logger.warning(f"inotify unavailable ({str(e)}). Falling back to polling.")
+    logger.info(f"Watching {folder} by polling every {POLL_INTERVAL}s.")
+    return PollingWatcher(folder)
+
+def pending_files() -> List[str]:
+    """Lists the raw files left by a previous run of the daemon: queued ones and the ones not processed to the end."""
+    pending = [path for path in scan_folder(WATCH_FOLDER) if not is_processed(path)]
+    if QUEUE_FOLDER:
+        pending += [path for path in scan_folder(QUEUE_FOLDER) if not is_processed(path)]
+    return sorted(pending, key=os.path.basename)
+
+def log_result(file_path: str, submitted_at: float) -> Callable[[Future], None]:
+    """Builds the callback logging the outcome of a processed file."""
+    def callback(future: Future) -> None:
+        try:
+            compute_time = future.result()
+            logger.info(f"{os.path.basename(file_path)} governed in {time.perf_counter() - submitted_at:.2f}s "
+                        f"({compute_time:.2f}s of compute).")
+        except Exception as e:
+            logger.error(f"Pipeline failed for {os.path.basename(file_path)}: {str(e)}")
+    return callback
+
+def main():
+    os.makedirs(WATCH_FOLDER, exist_ok=True)
+    watch_folder = QUEUE_FOLDER or WATCH_FOLDER
+    os.makedirs(watch_folder, exist_ok=True)
+    watcher = create_watcher(watch_folder)
+
+    stop = []
+    signal.signal(signal.SIGTERM, lambda signum, frame: stop.append(signum))
+
+    executor = ProcessPoolExecutor(max_workers=WORKERS, initializer=init_worker)
+    # Start the workers now so the first file does not pay the cold start
+    for _ in range(WORKERS):
+        executor.submit(time.sleep, 0)
+    logger.info(f"Pipeline daemon started with {WORKERS} warm workers.")
+
+    submitted: Set[str] = set()
+
+    def submit(path: str) -> None:
+        if os.path.basename(path) in submitted:
+            return
+        submitted.add(os.path.basename(path))
+        if QUEUE_FOLDER and os.path.dirname(path) != WATCH_FOLDER:
+            target = os.path.join(WATCH_FOLDER, os.path.basename(path))
+            shutil.move(path, target)
+            path = target
+        future = executor.submit(process_file, path)
+        future.add_done_callback(log_result(path, time.perf_counter()))
+
+    try:
+        # Files queued or interrupted while the daemon was down are processed first
+        backlog = pending_files()
+        if backlog:
+            logger.info(f"Resuming {len(backlog)} raw files left by a previous run.")
+        for path in backlog:
+            submit(path)
+
+        while not stop:
+            for path in watcher.poll(POLL_INTERVAL):
+                logger.info(f"New raw file: {os.path.basename(path)}")
+                submit(path)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        logger.info("Stopping the pipeline daemon. Waiting for the running files...")
+        executor.shutdown(wait=True)
+
+if __name__ == "__main__":
+    main()
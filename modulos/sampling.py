@@ -0,0 +1,183 @@
+import logging
+import math
+import os
+import numpy as np
+import pandas as pd
+from statistics import NormalDist
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Files above this size are validated on a sample instead of the full data
+SAMPLE_THRESHOLD_MB = 512
+SAMPLE_SIZE = 100_000
+CHUNK_SIZE = 100_000
+
+# Highest failure rate accepted for an expectation validated on a sample
+MAX_FAILURE_RATE = 0.001
+CONFIDENCE = 0.95
+
+# Expectations over the whole column: a duplicated pair is only seen when both rows are drawn, so their failure
+# rate cannot be estimated on a sample. They are counted exactly on the full column instead.
+WHOLE_COLUMN_EXPECTATIONS = ('expect_column_values_to_be_unique',)
+
+def should_sample(file_path: str, threshold_mb: float = SAMPLE_THRESHOLD_MB) -> bool:
+    """Checks if the file is large enough to be validated on a sample."""
+    return os.path.getsize(file_path) > threshold_mb * 1024 * 1024
+
+def reservoir_sample(file_path: str, sample_size: int = SAMPLE_SIZE, chunksize: int = CHUNK_SIZE,
+                     seed: Optional[int] = None, **read_csv_kwargs) -> Tuple[pd.DataFrame, int]:
+    """
+    Draws a uniform random sample of rows from a CSV file in a single streaming read.
+
+    Every row gets a random key and the rows with the smallest keys are kept, so memory
+    is bounded by sample_size + chunksize rows.
+
+    Returns:
+        Tuple[pd.DataFrame, int]: The sample (indexed by the row position in the file) and the total number of rows.
+    """
+    rng = np.random.default_rng(seed)
+    reservoir = None
+    keys = np.empty(0)
+    total_rows = 0
+
+    for chunk in pd.read_csv(file_path, chunksize=chunksize, **read_csv_kwargs):
+        chunk.index = pd.RangeIndex(total_rows, total_rows + len(chunk))
+        total_rows += len(chunk)
+
+        chunk_keys = rng.random(len(chunk))
+        if reservoir is None:
+            reservoir, keys = chunk, chunk_keys
+        else:
+            reservoir = pd.concat([reservoir, chunk])
+            keys = np.concatenate([keys, chunk_keys])
+
+        if len(reservoir) > sample_size:
+            keep = np.argpartition(keys, sample_size)[:sample_size]
+            reservoir, keys = reservoir.iloc[keep], keys[keep]
+
+    if reservoir is None:
+        raise ValueError(f"No rows found in the file: {file_path}")
+
+    logger.info(f"Sampled {len(reservoir)} of {total_rows} rows from {file_path}")
+    return reservoir.sort_index(), total_rows
+
+def whole_column_failures(results: Dict[str, Any], file_path: str, **read_csv_kwargs) -> Dict[str, int]:
+    """
+    Counts, on the full file, the failures of the whole-column expectations validated on a sample.
+
+    Only the column of each expectation is read. Returns the failures per '<expectation>:<column>'.
+    """
+    failures = {}
+    for expectation in results['results']:
+        config = expectation['expectation_config']
+        if config['expectation_type'] not in WHOLE_COLUMN_EXPECTATIONS:
+            continue
+        column = config['kwargs']['column']
+        options = dict(read_csv_kwargs, usecols=[column])
+        if 'dtype' in options:
+            options['dtype'] = {c: dtype for c, dtype in options['dtype'].items() if c == column}
+        values = pd.read_csv(file_path, **options)[column]
+        failures[f"{config['expectation_type']}:{column}"] = int((values.duplicated(keep=False) & values.notna()).sum())
+    return failures
+
+def wilson_interval(failures: int, n: int, confidence: float = CONFIDENCE) -> Tuple[float, float]:
+    """Wilson score confidence interval for a failure rate observed on n rows."""
+    if n == 0:
+        return 0.0, 1.0
+    z = NormalDist().inv_cdf((1 + confidence) / 2)
+    rate = failures / n
+    denominator = 1 + z ** 2 / n
+    center = (rate + z ** 2 / (2 * n)) / denominator
+    margin = z * math.sqrt(rate * (1 - rate) / n + z ** 2 / (4 * n ** 2)) / denominator
+    return max(0.0, center - margin), min(1.0, center + margin)
+
+def assess_sample(results: Dict[str, Any], sample_rows: int, total_rows: int,
+                  exact_failures: Optional[Dict[str, int]] = None,
+                  max_failure_rate: float = MAX_FAILURE_RATE, confidence: float = CONFIDENCE) -> Dict[str, Any]:
+    """
+    Estimates the failure rate of each expectation validated on a sample.
+
+    Each expectation is 'aprovado' when the upper bound of its interval is within max_failure_rate,
+    'reprovado' when the lower bound is above it and 'limítrofe' otherwise. A borderline expectation
+    means the sample cannot decide and the full validation must be run.
+
+    Whole-column expectations (uniqueness) are never decided by the sample: they use exact_failures,
+    counted on the full file by whole_column_failures, and are 'não estimável' (escalating) without it.
+    """
+    expectativas = []
+    for expectation in results['results']:
+        config = expectation['expectation_config']
+        result = expectation['result']
+        item = {
+            'expectativa': config['expectation_type'],
+            'coluna': config['kwargs'].get('column', 'N/A')
+        }
+
+        name = f"{config['expectation_type']}:{item['coluna']}"
+        if config['expectation_type'] in WHOLE_COLUMN_EXPECTATIONS:
+            if exact_failures is not None and name in exact_failures:
+                failures = exact_failures[name]
+                item.update({'taxa_falha': failures / total_rows if total_rows else 0.0, 'intervalo': None,
+                             'decisao': 'aprovado' if failures == 0 else 'reprovado'})
+            else:
+                item.update({'taxa_falha': None, 'intervalo': None, 'decisao': 'não estimável'})
+        elif 'unexpected_count' in result and result.get('element_count'):
+            n = int(result['element_count'])
+            failures = int(result['unexpected_count'])
+            lower, upper = wilson_interval(failures, n, confidence)
+            if upper <= max_failure_rate:
+                decisao = 'aprovado'
+            elif lower > max_failure_rate:
+                decisao = 'reprovado'
+            else:
+                decisao = 'limítrofe'
+            item.update({'taxa_falha': failures / n, 'intervalo': (lower, upper), 'decisao': decisao})
+        else:
+            # Table and aggregate expectations do not depend on the sampled rows
+            item.update({'taxa_falha': None, 'intervalo': None,
+                         'decisao': 'aprovado' if expectation['success'] else 'reprovado'})
+        expectativas.append(item)
+
+    assessment = {
+        'linhas_amostra': sample_rows,
+        'linhas_total': total_rows,
+        'confianca': confidence,
+        'taxa_maxima': max_failure_rate,
+        'expectativas': expectativas,
+        'escalar': any(item['decisao'] in ('limítrofe', 'não estimável') for item in expectativas),
+        'sucesso': all(item['decisao'] == 'aprovado' for item in expectativas)
+    }
+    return assessment
+
+def render_sample_section(assessment: Optional[Dict[str, Any]]) -> str:
+    """Renders the sampling summary of the HTML validation report."""
+    if assessment is None:
+        return ''
+
+    def format_rate(item: Dict[str, Any]) -> str:
+        if item['taxa_falha'] is None:
+            return 'N/A'
+        if item['intervalo'] is None:
+            return f"{item['taxa_falha']:.4%} (exata, arquivo completo)"
+        lower, upper = item['intervalo']
+        return f"{item['taxa_falha']:.4%} (IC {assessment['confianca']:.0%}: {lower:.4%} – {upper:.4%})"
+
+    return f"""
+            <h2>Validação por Amostragem:</h2>
+            <div class="status {'success' if assessment['sucesso'] else 'failure'}">
+                Amostra de {assessment['linhas_amostra']} de {assessment['linhas_total']} linhas.
+                Taxa máxima de falha aceita: {assessment['taxa_maxima']:.4%}.
+                {'Resultado limítrofe: validação completa executada.' if assessment['escalar'] else ''}
+            </div>
+            {''.join(f'''
+            <div class="validation-item">
+                <h3>{item['expectativa']}</h3>
+                <ul>
+                    <li><strong>Coluna:</strong> {item['coluna']}</li>
+                    <li><strong>Taxa de falha:</strong> {format_rate(item)}</li>
+                    <li><strong>Decisão:</strong> {item['decisao']}</li>
+                </ul>
+            </div>
+            ''' for item in assessment['expectativas'])}
+    """
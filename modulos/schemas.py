@@ -0,0 +1,144 @@
+import importlib.util
+import logging
+import pandas as pd
+from typing import Any, Dict, List, Optional, Tuple
+from handoff import read_handoff
+
+logger = logging.getLogger(__name__)
+
+# The pyarrow engine parses in parallel; fall back to the C engine when pyarrow is not installed
+ENGINE = 'pyarrow' if importlib.util.find_spec('pyarrow') else 'c'
+
+# Expected columns and dtypes of each dataset of the pipeline.
+# Columns with coerce=True may hold unparsable values: they are read as inferred and
+# converted with to_numeric, counting the values that failed to parse. A coerce column whose
+# values are all integers keeps int64; the dtype is applied only when it has nulls or decimals.
+SCHEMAS: Dict[str, Dict[str, Dict[str, Any]]] = {
+    'processed': {
+        'id': {'dtype': 'float64', 'coerce': True},
+        'nome': {'dtype': 'object'},
+        'idade': {'dtype': 'float64', 'coerce': True},
+        'salario': {'dtype': 'float64', 'coerce': True}
+    },
+    'cleaned': {
+        'id': {'dtype': 'int64'},
+        'nome': {'dtype': 'object'},
+        'idade': {'dtype': 'float64', 'coerce': True},
+        'salario': {'dtype': 'float64', 'coerce': True}
+    },
+    'enriched': {
+        'id': {'dtype': 'int64'},
+        'nome': {'dtype': 'object'},
+        'idade': {'dtype': 'float64'},
+        'salario': {'dtype': 'float64'},
+        'faixa_salarial': {'dtype': 'object'}
+    },
+    'final': {
+        'id': {'dtype': 'int64'},
+        'idade': {'dtype': 'float64'},
+        'salario': {'dtype': 'float64'},
+        'faixa_salarial': {'dtype': 'object'},
+        'nome_mascarado': {'dtype': 'object'}
+    }
+}
+
+def get_schema(dataset: str) -> Dict[str, Dict[str, Any]]:
+    """Gets the schema of a dataset registered in SCHEMAS."""
+    if dataset not in SCHEMAS:
+        raise KeyError(f"Unknown dataset: {dataset}. Registered datasets: {', '.join(SCHEMAS)}")
+    return SCHEMAS[dataset]
+
+def extend_schema(dataset: str, columns: List[str], dtype: str = 'object', optional: bool = False) -> None:
+    """
+    Adds columns known only at runtime (e.g. from the reference tables or a cleaning rules file) to the schema
+    of a dataset, registering the dataset when it is not in SCHEMAS. Optional columns are read only when
+    the file has them.
+    """
+    schema = SCHEMAS.setdefault(dataset, {})
+    for column in columns:
+        spec = {'dtype': dtype, 'optional': True} if optional else {'dtype': dtype}
+        schema.setdefault(column, spec)
+
+def present_columns(dataset: str, file_path: Optional[str] = None) -> List[str]:
+    """Gets the columns of a dataset to read from a file: all of them, less the optional ones not in its header."""
+    schema = get_schema(dataset)
+    optional = [column for column, spec in schema.items() if spec.get('optional', False)]
+    if not optional or file_path is None:
+        return [column for column in schema if column not in optional]
+    header = set(pd.read_csv(file_path, nrows=0).columns)
+    return [column for column in schema if column not in optional or column in header]
+
+def read_options(dataset: str, file_path: Optional[str] = None) -> Dict[str, Any]:
+    """
+    Builds the read_csv arguments (usecols and explicit dtypes) of a dataset.
+
+    The optional columns are included only when file_path is given and its header has them.
+    """
+    schema = get_schema(dataset)
+    columns = present_columns(dataset, file_path)
+    return {
+        'usecols': columns,
+        'dtype': {
+            column: schema[column]['dtype'] for column in columns
+            if schema[column]['dtype'] != 'object' and not schema[column].get('coerce', False)
+        }
+    }
+
+def coerce_columns(df: pd.DataFrame, dataset: str) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Converts the coerce columns of a dataset, returning the number of values that failed to parse per column.
+
+    Like to_numeric, a column whose values all parse as integers stays int64 (an id validated as int is
+    not turned into float); the other columns get the dtype of the schema.
+    """
+    parse_failures = {}
+    for column, spec in get_schema(dataset).items():
+        if not spec.get('coerce', False) or column not in df.columns:
+            continue
+        if df[column].dtype == spec['dtype'] or pd.api.types.is_integer_dtype(df[column]):
+            parse_failures[column] = 0
+            continue
+        values = pd.to_numeric(df[column], errors='coerce')
+        if not pd.api.types.is_integer_dtype(values):
+            values = values.astype(spec['dtype'])
+        parse_failures[column] = int((values.isna() & df[column].notna()).sum())
+        df[column] = values
+    return df, parse_failures
+
+def read_dataset(file_path: str, dataset: str, coerce: bool = True) -> Tuple[pd.DataFrame, Dict[str, int]]:
+    """
+    Reads a CSV file of the pipeline using its registered schema.
+
+    When the previous stage left a current Arrow IPC handoff for the file, it is memory-mapped instead of parsing
+    the CSV. Its columns get the same dtypes and coercion as the CSV.
+
+    Args:
+        file_path (str): Path of the CSV file.
+        dataset (str): Dataset name in SCHEMAS ('processed', 'cleaned', 'enriched' or 'final').
+        coerce (bool): Convert the coerce columns. When False they keep the values as read.
+
+    Returns:
+        Tuple[pd.DataFrame, Dict[str, int]]: The data and the parse failures per column.
+    """
+    schema = get_schema(dataset)
+    optional = [column for column, spec in schema.items() if spec.get('optional', False)]
+    df = read_handoff(file_path, present_columns(dataset), optional)
+    if df is not None:
+        # Only the columns whose dtype differs are converted, the others keep their zero-copy buffers
+        for column in df.columns:
+            dtype = schema[column]['dtype']
+            if dtype != 'object' and not schema[column].get('coerce', False) and df[column].dtype != dtype:
+                df[column] = df[column].astype(dtype)
+    else:
+        df = pd.read_csv(file_path, engine=ENGINE, **read_options(dataset, file_path))
+    if not coerce:
+        return df, {}
+    df, parse_failures = coerce_columns(df, dataset)
+    log_parse_failures(parse_failures, file_path)
+    return df, parse_failures
+
+def log_parse_failures(parse_failures: Dict[str, int], file_path: str) -> None:
+    """Logs the columns with values that failed to parse."""
+    for column, count in parse_failures.items():
+        if count:
+            logger.warning(f"{count} values of column '{column}' could not be parsed in {file_path}")
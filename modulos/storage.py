@@ -0,0 +1,136 @@
+import gzip
+import hashlib
+import io
+import logging
+import os
+import boto3
+from botocore.exceptions import ClientError
+from typing import IO, Any, Dict, Optional, Tuple, Union
+
+logger = logging.getLogger(__name__)
+
+# Compression of the local and S3 artifacts: 'none', 'gzip' or 'zstd' (set with PIPELINE_COMPRESSION)
+COMPRESSION = os.environ.get('PIPELINE_COMPRESSION', 'none').lower()
+COMPRESSION_EXTENSIONS = {'gzip': '.gz', 'zstd': '.zst'}
+CONTENT_TYPES = {'.csv': 'text/csv', '.json': 'application/json', '.html': 'text/html'}
+
+# Alternative S3 endpoint (e.g. a local MinIO or moto server) set with S3_ENDPOINT_URL
+S3_ENDPOINT_URL = os.environ.get('S3_ENDPOINT_URL')
+HASH_METADATA_KEY = 'content-sha256'
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+def get_compression(compression: Optional[str] = None) -> Optional[str]:
+    """Gets the configured compression, or None when artifacts are written uncompressed."""
+    compression = (compression or COMPRESSION).lower()
+    if compression == 'none':
+        return None
+    if compression not in COMPRESSION_EXTENSIONS:
+        raise ValueError(f"Unsupported compression: {compression}. Use 'none', 'gzip' or 'zstd'.")
+    return compression
+
+def compressed_path(path: str, compression: Optional[str] = None) -> str:
+    """Adds the extension of the configured compression to an artifact path."""
+    compression = get_compression(compression)
+    return path + COMPRESSION_EXTENSIONS[compression] if compression else path
+
+def get_file_compression(path: str) -> Optional[str]:
+    """Gets the compression of a file from its extension."""
+    for compression, extension in COMPRESSION_EXTENSIONS.items():
+        if path.endswith(extension):
+            return compression
+    return None
+
+def strip_compression(path: str) -> str:
+    """Removes the compression extension from a path."""
+    compression = get_file_compression(path)
+    return path[:-len(COMPRESSION_EXTENSIONS[compression])] if compression else path
+
+def is_csv(path: str) -> bool:
+    """Checks if the path is a CSV file, compressed or not."""
+    return strip_compression(path).endswith('.csv')
+
+def csv_compression(path: str) -> Union[str, Dict[str, Any]]:
+    """Builds the to_csv compression argument of a path. Gzip gets a fixed mtime so identical data gives identical bytes."""
+    if get_file_compression(path) == 'gzip':
+        return {'method': 'gzip', 'mtime': 0}
+    return 'infer'
+
+def open_artifact(path: str, mode: str = 'rt') -> IO:
+    """Opens an artifact, compressing or decompressing it transparently according to its extension."""
+    compression = get_file_compression(path)
+    if compression == 'gzip' and 'w' in mode:
+        handle = gzip.GzipFile(path, mode.replace('t', ''), mtime=0)
+        return io.TextIOWrapper(handle, encoding='utf-8') if 't' in mode else handle
+    if compression == 'gzip':
+        return gzip.open(path, mode, encoding='utf-8' if 't' in mode else None)
+    if compression == 'zstd':
+        import zstandard
+        return zstandard.open(path, mode, encoding='utf-8' if 't' in mode else None)
+    return open(path, mode, encoding='utf-8' if 't' in mode else None)
+
+def upload_extra_args(path: str) -> Dict[str, str]:
+    """Builds the S3 ContentType and ContentEncoding metadata of an artifact."""
+    compression = get_file_compression(path)
+    extra_args = {}
+    content_type = CONTENT_TYPES.get(os.path.splitext(strip_compression(path))[1])
+    if content_type:
+        extra_args['ContentType'] = content_type
+    if compression:
+        extra_args['ContentEncoding'] = compression
+    return extra_args
+
+def get_s3_client():
+    """Creates the S3 client, pointing to S3_ENDPOINT_URL when set."""
+    return boto3.client('s3', endpoint_url=S3_ENDPOINT_URL)
+
+def file_fingerprint(path: str) -> Dict[str, int]:
+    """Identifies a version of a file by its size and modification time, without reading it."""
+    stat = os.stat(path)
+    return {'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+def file_digests(path: str) -> Tuple[str, str]:
+    """Computes the MD5 and SHA-256 hex digests of a file in a single read."""
+    md5 = hashlib.md5()
+    sha256 = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b''):
+            md5.update(chunk)
+            sha256.update(chunk)
+    return md5.hexdigest(), sha256.hexdigest()
+
+def is_unchanged(head: Dict[str, Any], md5: str, sha256: str) -> bool:
+    """
+    Checks if an S3 object has the same content as a local file.
+
+    Uses the SHA-256 stored in the object metadata, or the ETag (the MD5 of objects uploaded in a single part)
+    for objects uploaded without it.
+    """
+    stored_sha256 = head.get('Metadata', {}).get(HASH_METADATA_KEY)
+    if stored_sha256:
+        return stored_sha256 == sha256
+    etag = head.get('ETag', '').strip('"')
+    return '-' not in etag and etag == md5
+
+def upload_artifact(s3, file_path: str, bucket_name: str, s3_key: str) -> bool:
+    """
+    Uploads a file to S3, skipping it when the object already has the same content.
+
+    Returns:
+        bool: True if the file was uploaded, False if the upload was skipped.
+    """
+    md5, sha256 = file_digests(file_path)
+    try:
+        head = s3.head_object(Bucket=bucket_name, Key=s3_key)
+    except ClientError as e:
+        if e.response['Error']['Code'] not in ('404', 'NoSuchKey', 'NotFound'):
+            raise
+        head = None
+
+    if head is not None and is_unchanged(head, md5, sha256):
+        logger.info(f"Unchanged artifact, upload skipped: s3://{bucket_name}/{s3_key}")
+        return False
+
+    extra_args = upload_extra_args(file_path)
+    extra_args['Metadata'] = {HASH_METADATA_KEY: sha256}
+    s3.upload_file(file_path, bucket_name, s3_key, ExtraArgs=extra_args)
+    return True
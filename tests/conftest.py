@@ -0,0 +1,66 @@
+import importlib.util
+import os
+import sys
+import pytest
+from botocore.exceptions import ClientError
+
+# The pipeline scripts import each other as top-level modules from the modulos folder
+MODULOS = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modulos')
+sys.path.insert(0, MODULOS)
+
+@pytest.fixture
+def load_script():
+    """Imports a stage script (their names are not valid module names) as a module."""
+    def load(script):
+        spec = importlib.util.spec_from_file_location(os.path.splitext(script)[0].replace('-', '_'), os.path.join(MODULOS, script))
+        module = importlib.util.module_from_spec(spec)
+        spec.loader.exec_module(module)
+        return module
+    return load
+
+class StubS3:
+    """
+    Local stand-in for the S3 client, shared by the tests.
+
+    head_object answers with a fixed object (or the error_code when there is none), upload_file and
+    delete_objects are recorded, the keys in failing are reported in the Errors of delete_objects and
+    list_objects_v2 pages list the given keys.
+    """
+
+    def __init__(self, head=None, error_code='404', failing=(), keys=()):
+        self.keys = sorted(keys)
+        self.head = head
+        self.error_code = error_code
+        self.failing = set(failing)
+        self.uploads = []
+        self.deletes = []
+
+    def head_object(self, Bucket, Key):
+        if self.head is None:
+            raise ClientError({'Error': {'Code': self.error_code, 'Message': 'Not Found'}}, 'HeadObject')
+        return self.head
+
+    def upload_file(self, Filename, Bucket, Key, ExtraArgs=None):
+        self.uploads.append({'Filename': Filename, 'Bucket': Bucket, 'Key': Key, 'ExtraArgs': ExtraArgs})
+
+    def delete_objects(self, Bucket, Delete):
+        keys = [obj['Key'] for obj in Delete['Objects']]
+        self.deletes.append(keys)
+        errors = [{'Key': key, 'Code': 'AccessDenied', 'Message': 'Access Denied'} for key in keys if key in self.failing]
+        return {'Deleted': [{'Key': key} for key in keys if key not in self.failing], **({'Errors': errors} if errors else {})}
+
+    def get_paginator(self, operation):
+        return self
+
+    def paginate(self, Bucket, Prefix='', Delimiter=None):
+        keys = [key for key in self.keys if key.startswith(Prefix)]
+        if Delimiter is None:
+            yield {'Contents': [{'Key': key, 'Size': 1} for key in keys]}
+            return
+        prefixes = sorted({Prefix + key[len(Prefix):].split(Delimiter)[0] + Delimiter for key in keys if Delimiter in key[len(Prefix):]})
+        yield {'CommonPrefixes': [{'Prefix': prefix} for prefix in prefixes]}
+
+@pytest.fixture
+def stub_s3():
+    """Builds StubS3 clients: stub_s3(head=..., error_code=..., failing=...)."""
+    return StubS3
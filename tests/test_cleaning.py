@@ -0,0 +1,24 @@
+import pandas as pd
+import pytest
+
+from cleaning import CleaningPlan, CLEANING_RULES
+
+@pytest.fixture
+def raw():
+    return pd.DataFrame({'id': ['1', 'dois', '3'], 'nome': ['Ana', 'Rui', None],
+                         'idade': ['30', '40', 'x'], 'salario': ['1000', None, '3000']})
+
+def test_filter_does_not_modify_its_input(raw):
+    as_read = raw.copy()
+
+    df, reasons = CleaningPlan(CLEANING_RULES['processed']).filter(raw)
+
+    pd.testing.assert_frame_equal(raw, as_read)
+    assert df.index.tolist() == [0, 2]
+    assert reasons.index.tolist() == [1]
+
+@pytest.mark.filterwarnings('error::pandas.errors.SettingWithCopyWarning')
+def test_apply_sets_columns_without_copy_warnings(raw):
+    df, _ = CleaningPlan(CLEANING_RULES['processed']).apply(raw)
+
+    assert pd.api.types.is_numeric_dtype(df['idade'])
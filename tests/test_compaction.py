@@ -0,0 +1,81 @@
+import json
+import pandas as pd
+import pytest
+
+from compaction import compact_local_folder, compact_s3_prefix, merge_csv, retire_local_copies, retire_s3
+
+def test_merge_csv_keeps_the_union_of_the_columns(tmp_path):
+    first, second = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    pd.DataFrame({'id': [1], 'nome': ['Ana']}).to_csv(first, index=False)
+    pd.DataFrame({'id': [2], 'regiao': ['Sul']}).to_csv(second, index=False)
+    output = tmp_path / 'merged.csv'
+
+    runs = merge_csv([('20240101_000000', str(first)), ('20240102_000000', str(second))], str(output))
+
+    merged = pd.read_csv(output)
+    assert list(merged.columns) == ['id', 'nome', 'regiao']
+    assert merged['regiao'].tolist()[1] == 'Sul'
+    assert [run['linhas'] for run in runs] == [1, 1]
+
+def test_merge_csv_keeps_the_original_values(tmp_path):
+    first, second = tmp_path / 'a.csv', tmp_path / 'b.csv'
+    first.write_text('id,cep,valor\n1,01310,10\n,04567,\n')
+    second.write_text('id,cep,valor\n3,00100,5\n')
+    output = tmp_path / 'merged.csv'
+
+    merge_csv([('20240101_000000', str(first)), ('20240102_000000', str(second))], str(output))
+
+    assert output.read_text() == 'id,cep,valor\n1,01310,10\n,04567,\n3,00100,5\n'
+
+def test_compact_local_folder_keeps_the_latest_run(tmp_path):
+    for run in ('20240101_000000', '20240102_000000', '20240103_000000'):
+        pd.DataFrame({'id': [1]}).to_csv(tmp_path / f"cleaned_data_{run}.csv", index=False)
+
+    assert compact_local_folder(str(tmp_path)) == 2
+    assert (tmp_path / 'cleaned_data_20240103_000000.csv').exists()
+    assert (tmp_path / 'archive' / 'cleaned_data_20240101_000000.csv').exists()
+
+def test_retire_local_copies_archives_old_handoffs_and_partition_copies(tmp_path):
+    for run in ('20240101_000000', '20240102_000000'):
+        for subfolder in ('handoff', 'partitions/dt=2024-01-01'):
+            (tmp_path / subfolder).mkdir(parents=True, exist_ok=True)
+        (tmp_path / 'handoff' / f"cleaned_data_{run}.arrow").write_bytes(b'arrow')
+        (tmp_path / 'partitions' / 'dt=2024-01-01' / f"final_data_{run}.csv").write_text('id\n1\n')
+
+    assert retire_local_copies(str(tmp_path)) == 2
+    assert (tmp_path / 'handoff' / 'cleaned_data_20240102_000000.arrow').exists()
+    assert (tmp_path / 'partitions' / 'dt=2024-01-01' / 'final_data_20240102_000000.csv').exists()
+    assert (tmp_path / 'archive' / 'handoff' / 'cleaned_data_20240101_000000.arrow').exists()
+    assert (tmp_path / 'archive' / 'partitions' / 'dt=2024-01-01' / 'final_data_20240101_000000.csv').exists()
+
+def test_retire_s3_deletes_in_batches_of_1000(stub_s3):
+    s3 = stub_s3()
+    retire_s3(s3, 'bucket', [f"k{i}" for i in range(2500)], policy='delete')
+    assert [len(batch) for batch in s3.deletes] == [1000, 1000, 500]
+
+def test_retire_s3_raises_on_delete_errors(stub_s3):
+    s3 = stub_s3(failing=['k1'])
+    with pytest.raises(RuntimeError, match='k1'):
+        retire_s3(s3, 'bucket', ['k0', 'k1'], policy='delete')
+
+def test_compact_s3_prefix_keeps_the_latest_run_of_the_prefix_only(monkeypatch):
+    moto = pytest.importorskip('moto')
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    with moto.mock_aws():
+        import boto3
+        s3 = boto3.client('s3')
+        s3.create_bucket(Bucket='bucket')
+        # Two runs in an old partition and one, the latest, in a newer partition
+        for dt, run in (('2024-01-01', '20240101_000000'), ('2024-01-01', '20240101_120000'), ('2024-01-02', '20240102_000000')):
+            s3.put_object(Bucket='bucket', Key=f"enriched-data/dt={dt}/enriched_data_{run}.csv", Body=b'id\n1\n')
+
+        assert compact_s3_prefix(s3, 'bucket', 'enriched-data') == 2
+
+        keys = sorted(obj['Key'] for obj in s3.list_objects_v2(Bucket='bucket')['Contents'])
+        assert keys == ['archive/enriched-data/dt=2024-01-01/enriched_data_20240101_000000.csv',
+                        'archive/enriched-data/dt=2024-01-01/enriched_data_20240101_120000.csv',
+                        'enriched-data/dt=2024-01-01/_index.json',
+                        'enriched-data/dt=2024-01-01/enriched_data_20240101_000000__20240101_120000.csv',
+                        'enriched-data/dt=2024-01-02/enriched_data_20240102_000000.csv']
+        index = json.load(s3.get_object(Bucket='bucket', Key='enriched-data/dt=2024-01-01/_index.json')['Body'])
+        assert [run['execucao'] for run in index[0]['execucoes']] == ['20240101_000000', '20240101_120000']
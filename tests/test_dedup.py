@@ -0,0 +1,34 @@
+import pandas as pd
+from dedup import deduplicate, deduplicate_file, normalized_key
+
+def test_deduplicate_keeps_first_and_ignores_null_keys():
+    df = pd.DataFrame({'id': [1, 2, 1, None, None], 'nome': ['a', 'b', 'c', 'd', 'e']})
+    kept, dropped = deduplicate(df)
+    assert kept['nome'].tolist() == ['a', 'b', 'd', 'e']
+    assert dropped['nome'].tolist() == ['c']
+
+def test_deduplicate_latest_by_order_column():
+    df = pd.DataFrame({'id': [1, 1, 1], 'versao': [2, 3, 1]})
+    kept, _ = deduplicate(df, keep='latest', order_by='versao')
+    assert kept['versao'].tolist() == [3]
+
+def test_normalized_key_does_not_depend_on_dtype():
+    as_int = normalized_key(pd.Series([7, 8]))
+    as_float = normalized_key(pd.Series([7.0, None]))
+    as_text = normalized_key(pd.Series(['7', 'seis']))
+    assert as_int[0] == as_float[0] == as_text[0]
+    assert pd.isna(as_float[1])
+    assert as_text[1] == 'seis'
+
+def test_deduplicate_file_finds_duplicates_across_chunks_with_different_dtypes(tmp_path):
+    input_path = tmp_path / 'entrada.csv'
+    output_path = tmp_path / 'saida.csv'
+    # The first chunk has a null id (read as float64), the second one only ints
+    pd.DataFrame({'id': [7, None, 3, 7, 3, 9], 'nome': list('abcdef')}).to_csv(input_path, index=False)
+
+    removed = deduplicate_file(str(input_path), str(output_path), partitions=4, chunksize=2)
+
+    output = pd.read_csv(output_path)
+    assert removed == 2
+    assert sorted(output['nome']) == ['a', 'b', 'c', 'f']
+    assert sorted(output['id'].dropna().astype(int)) == [3, 7, 9]
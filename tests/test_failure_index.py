@@ -0,0 +1,67 @@
+import os
+import numpy as np
+import pandas as pd
+import pytest
+
+@pytest.fixture
+def raw_validation(load_script):
+    return load_script('04_validates_raw_data_quality.py')
+
+@pytest.fixture
+def quality_apply(load_script):
+    return load_script('05_quality_apply.py')
+
+def results_with_failures(failing_rows):
+    """Validation results in the Great Expectations format, with the failing rows of each expectation."""
+    return {'results': [
+        {'expectation_config': {'expectation_type': name.split(':')[0], 'kwargs': {'column': name.split(':')[1]}},
+         'result': {'unexpected_index_list': rows}}
+        for name, rows in failing_rows.items()
+    ]}
+
+@pytest.fixture
+def raw_file(tmp_path):
+    path = tmp_path / 'processed_data_20250101_100000.csv'
+    pd.DataFrame({'id': ['1', 'seis', '3', None], 'nome': ['a', 'b', None, 'd'], 'idade': [30, 40, None, 50],
+                  'salario': [1000, 2000, 3000, 4000]}).to_csv(path, index=False)
+    return str(path)
+
+def test_failure_index_round_trip(raw_validation, quality_apply, raw_file, tmp_path):
+    df = pd.read_csv(raw_file)
+    results = results_with_failures({
+        'expect_column_values_to_not_be_null:id': [1, 3],
+        'expect_column_values_to_not_be_null:nome': [2]
+    })
+    index_path = str(tmp_path / 'failure_index_20250101_100000.npz')
+    raw_validation.save_failure_index(raw_validation.build_failure_index(df, results, raw_file), index_path)
+
+    failure_index = quality_apply.load_failure_index(index_path, raw_file)
+    assert failure_index is not None
+    assert int(failure_index['total_linhas']) == 4
+
+    kept, quarantine = quality_apply.split_quarantine(df, failure_index)
+    assert kept.index.tolist() == [0, 2]
+    assert quarantine.index.tolist() == [1, 3]
+    assert quarantine['falhas'].tolist() == ['expect_column_values_to_not_be_null:id'] * 2
+    assert quality_apply.indexed_null_checks(failure_index) == ['id']
+
+def test_failure_index_of_another_file_version_is_ignored(raw_validation, quality_apply, raw_file, tmp_path):
+    df = pd.read_csv(raw_file)
+    results = results_with_failures({'expect_column_values_to_not_be_null:id': [1]})
+    index_path = str(tmp_path / 'failure_index_20250101_100000.npz')
+    raw_validation.save_failure_index(raw_validation.build_failure_index(df, results, raw_file), index_path)
+
+    # Same number of rows, different content
+    pd.DataFrame({'id': ['9', '8', '7', '6'], 'nome': list('abcd'), 'idade': [1, 2, 3, 4],
+                  'salario': [1, 2, 3, 4]}).to_csv(raw_file, index=False)
+    stat = os.stat(raw_file)
+    os.utime(raw_file, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    assert quality_apply.load_failure_index(index_path, raw_file) is None
+
+def test_load_and_prepare_data_quarantines_invalid_ids_without_index(quality_apply, raw_file):
+    df, quarantine = quality_apply.load_and_prepare_data(raw_file)
+    assert df['id'].tolist() == [1, 3]
+    assert df['id'].dtype == np.int64
+    assert df['nome'].tolist() == ['a', 'Unknown']
+    # Quarantined rows keep the values as read, for audit
+    assert sorted(quarantine['id'].fillna('')) == ['', 'seis']
@@ -0,0 +1,47 @@
+import os
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import handoff
+from handoff import handoff_path, has_handoff, read_handoff, write_handoff
+from schemas import read_dataset
+
+@pytest.fixture
+def arrow_mode(monkeypatch):
+    monkeypatch.setattr(handoff, 'HANDOFF_FORMAT', 'arrow')
+
+def cleaned_frame():
+    return pd.DataFrame({'id': [1, 2], 'nome': ['a', 'b'], 'idade': [30.0, 40.0], 'salario': [1000.0, 2000.0]})
+
+def test_handoff_is_read_with_the_schema_dtypes(arrow_mode, tmp_path):
+    csv_path = str(tmp_path / 'cleaned_data_20250101_100000.csv')
+    df = cleaned_frame()
+    df.to_csv(csv_path, index=False)
+    # id stored as float64 in the handoff: converted to the int64 of the schema
+    write_handoff(df.astype({'id': 'float64'}), csv_path)
+
+    result, _ = read_dataset(csv_path, 'cleaned')
+    assert has_handoff(csv_path)
+    assert result['id'].dtype == 'int64'
+    pd.testing.assert_frame_equal(result, df)
+
+def test_handoff_older_than_the_csv_is_ignored(arrow_mode, tmp_path):
+    csv_path = str(tmp_path / 'cleaned_data_20250101_100000.csv')
+    write_handoff(cleaned_frame(), csv_path)
+    rewritten = cleaned_frame().assign(nome=['x', 'y'])
+    rewritten.to_csv(csv_path, index=False)
+    stat = os.stat(handoff_path(csv_path))
+    os.utime(csv_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    assert not has_handoff(csv_path)
+    assert read_handoff(csv_path) is None
+    result, _ = read_dataset(csv_path, 'cleaned')
+    assert result['nome'].tolist() == ['x', 'y']
+
+def test_handoff_missing_columns_is_ignored(arrow_mode, tmp_path):
+    csv_path = str(tmp_path / 'cleaned_data_20250101_100000.csv')
+    cleaned_frame().to_csv(csv_path, index=False)
+    write_handoff(cleaned_frame().drop(columns='salario'), csv_path)
+    assert read_handoff(csv_path, ['id', 'salario']) is None
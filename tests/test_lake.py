@@ -0,0 +1,55 @@
+import logging
+import pandas as pd
+import pytest
+
+import schemas
+from lake import carry_partition_column, list_partitions, partition_files, read_partitions
+from schemas import read_dataset
+
+@pytest.fixture
+def enriched_schema(monkeypatch):
+    monkeypatch.setitem(schemas.SCHEMAS, 'enriched', dict(schemas.SCHEMAS['enriched']))
+
+def write_enriched(path, **extra):
+    df = pd.DataFrame({'id': [1, 2], 'nome': ['Ana', 'Rui'], 'idade': [30.0, 40.0], 'salario': [1.0, 2.0],
+                       'faixa_salarial': ['Baixa', 'Baixa'], **extra})
+    df.to_csv(path, index=False)
+
+def test_partition_column_is_carried_and_splits_the_file(enriched_schema, tmp_path):
+    path = tmp_path / 'enriched_data_20240101_000000.csv'
+    write_enriched(path, data_evento=['2024-01-01', '2024-01-02'])
+
+    carry_partition_column('enriched', 'data_evento')
+    df, _ = read_dataset(str(path), 'enriched')
+
+    assert 'data_evento' in df.columns
+    files = partition_files(df, str(path), 'data_evento')
+    assert [dt for dt, _ in files] == ['2024-01-01', '2024-01-02']
+
+def test_missing_partition_column_falls_back_to_the_run_date(enriched_schema, tmp_path, caplog):
+    path = tmp_path / 'enriched_data_20240101_000000.csv'
+    write_enriched(path)
+
+    carry_partition_column('enriched', 'data_evento')
+    df, _ = read_dataset(str(path), 'enriched')
+
+    with caplog.at_level(logging.WARNING):
+        files = partition_files(df, str(path), 'data_evento')
+    assert files == [('2024-01-01', str(path))]
+    assert "Partition column 'data_evento'" in caplog.text
+
+def test_read_partitions_keeps_the_columns_not_in_the_schema(tmp_path):
+    folder = tmp_path / 'governed-data' / 'dt=2024-01-01'
+    folder.mkdir(parents=True)
+    pd.DataFrame({'id': [1], 'idade': [30.0], 'salario': [1.0], 'faixa_salarial': ['Baixa'], 'nome_mascarado': ['A**'],
+                  'departamento': ['TI'], 'data_evento': ['2024-01-01']}).to_csv(folder / 'final_data_20240101_000000.csv', index=False)
+
+    df = read_partitions(str(tmp_path / 'governed-data'), '2024-01-01', '2024-01-01', dataset='final')
+
+    assert {'departamento', 'data_evento', 'dt'} <= set(df.columns)
+    assert df['id'].dtype == 'int64'
+
+def test_list_partitions_uses_the_given_client(stub_s3):
+    s3 = stub_s3(keys=['enriched-data/dt=2024-01-02/a.csv', 'enriched-data/dt=2024-01-01/b.csv', 'raw-data/dt=2024-01-03/c.csv'])
+
+    assert list_partitions('s3://bucket/enriched-data', s3) == ['2024-01-01', '2024-01-02']
@@ -0,0 +1,37 @@
+import os
+import pandas as pd
+import pytest
+
+pytest.importorskip('pyarrow')
+
+import lookup
+from lookup import enrich_with_references, get_reference_index
+
+@pytest.fixture
+def reference(tmp_path, monkeypatch):
+    monkeypatch.setattr(lookup, 'INDEX_FOLDER', str(tmp_path / 'indices'))
+    path = tmp_path / 'departamento.csv'
+    pd.DataFrame({'id': [3, 1, 2, 1], 'departamento': ['C', 'A', 'B', 'A2']}).to_csv(path, index=False)
+    return {'name': 'departamento', 'path': str(path), 'key': 'id', 'columns': ['departamento']}
+
+def test_lookup_keeps_the_first_row_per_key_and_nulls_for_missing_keys(reference):
+    df = pd.DataFrame({'id': [2, 1, 9]})
+
+    enriched = enrich_with_references(df, [reference])
+
+    assert enriched['departamento'].tolist()[:2] == ['B', 'A']
+    assert pd.isna(enriched['departamento'].iloc[2])
+
+def test_index_is_written_atomically_and_rebuilt_when_the_source_changes(reference):
+    get_reference_index(reference)
+    index_path = os.path.join(lookup.INDEX_FOLDER, 'departamento.arrow')
+    built = os.stat(index_path).st_mtime_ns
+    assert sorted(os.listdir(lookup.INDEX_FOLDER)) == ['departamento.arrow', 'departamento.json']
+
+    get_reference_index(reference)
+    assert os.stat(index_path).st_mtime_ns == built
+
+    pd.DataFrame({'id': [1], 'departamento': ['Z']}).to_csv(reference['path'], index=False)
+    index = get_reference_index(reference)
+    assert index.keys.tolist() == [1]
+    assert not [f for f in os.listdir(lookup.INDEX_FOLDER) if f.endswith('.tmp')]
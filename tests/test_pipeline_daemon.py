@@ -0,0 +1,51 @@
+import os
+import types
+import pytest
+import pipeline_daemon
+
+@pytest.fixture
+def folders(tmp_path, monkeypatch):
+    watch = tmp_path / 'arquivos'
+    queue = tmp_path / 'fila'
+    watch.mkdir()
+    queue.mkdir()
+    monkeypatch.setattr(pipeline_daemon, 'WATCH_FOLDER', str(watch))
+    monkeypatch.setattr(pipeline_daemon, 'QUEUE_FOLDER', str(queue))
+    return watch, queue
+
+def test_pending_files_skips_governed_files(folders):
+    watch, queue = folders
+    (watch / 'processed_data_20250101_100000.csv').write_text('id\n1\n')
+    (watch / 'final_data_20250101_100000.csv').write_text('id\n1\n')
+    (watch / 'processed_data_20250102_100000.csv').write_text('id\n1\n')
+    (queue / 'processed_data_20250103_100000.csv').write_text('id\n1\n')
+    (queue / 'notas.txt').write_text('')
+
+    assert [os.path.basename(p) for p in pipeline_daemon.pending_files()] == [
+        'processed_data_20250102_100000.csv', 'processed_data_20250103_100000.csv'
+    ]
+
+def test_process_file_stops_at_the_failed_stage(folders, monkeypatch):
+    watch, _ = folders
+    raw_path = watch / 'processed_data_20250101_100000.csv'
+    raw_path.write_text('id\n1\n')
+    calls = []
+
+    def stage(script, fails=False):
+        def main(file_path):
+            calls.append(script)
+            if fails:
+                raise RuntimeError(f"{script} failed")
+        return types.SimpleNamespace(main=main)
+
+    stages = {script: stage(script, fails=script.startswith('04')) for script, _ in pipeline_daemon.STAGES}
+    monkeypatch.setattr(pipeline_daemon, '_stages', stages)
+
+    with pytest.raises(RuntimeError, match='04_validates_raw_data_quality.py failed'):
+        pipeline_daemon.process_file(str(raw_path))
+    assert calls == ['02-upload_file_s3.py', '03_observability.py', '04_validates_raw_data_quality.py']
+
+def test_stage_raises_when_given_the_file(load_script, tmp_path):
+    security = load_script('08_security.py')
+    with pytest.raises(Exception):
+        security.main(str(tmp_path / 'enriched_data_20250101_100000.csv'))
@@ -0,0 +1,65 @@
+import pandas as pd
+import pytest
+from sampling import assess_sample, reservoir_sample, whole_column_failures, wilson_interval
+
+def expectation(expectation_type, column, success, unexpected_count=None, element_count=None):
+    result = {}
+    if unexpected_count is not None:
+        result = {'unexpected_count': unexpected_count, 'element_count': element_count}
+    return {'expectation_config': {'expectation_type': expectation_type, 'kwargs': {'column': column}},
+            'success': success, 'result': result}
+
+def test_wilson_interval_contains_the_observed_rate():
+    lower, upper = wilson_interval(10, 1000)
+    assert lower < 0.01 < upper
+    assert wilson_interval(0, 1000)[0] == pytest.approx(0.0, abs=1e-12)
+    assert wilson_interval(0, 0) == (0.0, 1.0)
+
+def test_wilson_interval_narrows_with_more_rows():
+    small = wilson_interval(1, 100)
+    large = wilson_interval(100, 10_000)
+    assert large[1] - large[0] < small[1] - small[0]
+
+def test_reservoir_sample_is_bounded_and_counts_every_row(tmp_path):
+    path = tmp_path / 'dados.csv'
+    pd.DataFrame({'id': range(1000)}).to_csv(path, index=False)
+    sample, total_rows = reservoir_sample(str(path), sample_size=50, chunksize=64, seed=1)
+    assert total_rows == 1000
+    assert len(sample) == 50
+    assert sample['id'].is_unique
+    # Indexed by the row position in the file
+    assert (sample.index == sample['id']).all()
+
+def test_assess_sample_decisions():
+    results = {'results': [
+        expectation('expect_column_values_to_not_be_null', 'id', True, 0, 100_000),
+        expectation('expect_column_values_to_be_between', 'idade', False, 5_000, 100_000),
+        expectation('expect_column_to_exist', 'nome', True)
+    ]}
+    assessment = assess_sample(results, 100_000, 10_000_000)
+    assert [item['decisao'] for item in assessment['expectativas']] == ['aprovado', 'reprovado', 'aprovado']
+    assert not assessment['escalar']
+    assert not assessment['sucesso']
+
+def test_assess_sample_escalates_uniqueness_without_exact_count():
+    results = {'results': [expectation('expect_column_values_to_be_unique', 'id', True, 0, 100_000)]}
+    assessment = assess_sample(results, 100_000, 10_000_000)
+    assert assessment['expectativas'][0]['decisao'] == 'não estimável'
+    assert assessment['escalar']
+
+@pytest.mark.parametrize('failures, decisao', [(0, 'aprovado'), (2, 'reprovado')])
+def test_assess_sample_uses_exact_uniqueness_count(failures, decisao):
+    # The sample saw no duplicate, but the decision comes from the full column
+    results = {'results': [expectation('expect_column_values_to_be_unique', 'id', True, 0, 100_000)]}
+    assessment = assess_sample(results, 100_000, 10_000_000, {'expect_column_values_to_be_unique:id': failures})
+    assert assessment['expectativas'][0]['decisao'] == decisao
+    assert not assessment['escalar']
+
+def test_whole_column_failures_reads_the_full_column(tmp_path):
+    path = tmp_path / 'dados.csv'
+    pd.DataFrame({'id': [1, 2, 2, None, None], 'nome': list('abcde')}).to_csv(path, index=False)
+    results = {'results': [expectation('expect_column_values_to_be_unique', 'id', True),
+                           expectation('expect_column_values_to_not_be_null', 'nome', True)]}
+    assert whole_column_failures(results, str(path), usecols=['id', 'nome'], dtype={'nome': 'object'}) == {
+        'expect_column_values_to_be_unique:id': 2
+    }
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+
+from schemas import coerce_columns, read_dataset
+
+@pytest.fixture
+def clean_file(tmp_path):
+    path = tmp_path / 'processed_data_20250101_100000.csv'
+    pd.DataFrame({'id': [1, 2, 3], 'nome': ['Ana', 'Rui', 'Eva'], 'idade': [30, 40, 50],
+                  'salario': [1000.5, 2000.0, 3000.0]}).to_csv(path, index=False)
+    return str(path)
+
+def test_clean_integer_columns_stay_int64(clean_file):
+    df, parse_failures = read_dataset(clean_file, 'processed')
+
+    assert df['id'].dtype == 'int64'
+    assert df['idade'].dtype == 'int64'
+    assert df['salario'].dtype == 'float64'
+    assert parse_failures == {'id': 0, 'idade': 0, 'salario': 0}
+
+def test_parse_failures_are_counted_per_column(tmp_path):
+    path = tmp_path / 'processed_data_20250101_100000.csv'
+    path.write_text('id,nome,idade,salario\n1,Ana,trinta,1000\n,Rui,40,mil\n3,Eva,50,abc\n')
+
+    df, parse_failures = read_dataset(str(path), 'processed')
+
+    assert parse_failures == {'id': 0, 'idade': 1, 'salario': 2}
+    assert df['id'].dtype == 'float64'
+    assert df['idade'].isna().tolist() == [True, False, False]
+    assert df['salario'].tolist()[0] == 1000.0
+
+def test_read_without_coerce_keeps_the_values_as_read(tmp_path):
+    path = tmp_path / 'processed_data_20250101_100000.csv'
+    path.write_text('id,nome,idade,salario\n1,Ana,trinta,1000\n')
+
+    df, parse_failures = read_dataset(str(path), 'processed', coerce=False)
+
+    assert parse_failures == {}
+    assert df['idade'].tolist() == ['trinta']
+
+def test_coerce_columns_skips_columns_not_in_the_frame():
+    df, parse_failures = coerce_columns(pd.DataFrame({'idade': ['1', 'x']}), 'processed')
+
+    assert parse_failures == {'idade': 1}
+    assert df['idade'].dtype == 'float64'
+
+def test_clean_raw_file_passes_the_int_id_expectation(load_script, clean_file):
+    raw_validation = load_script('04_validates_raw_data_quality.py')
+
+    results = raw_validation.validate_data(raw_validation.load_and_prepare_data(clean_file))
+
+    assert results['success']
@@ -0,0 +1,115 @@
+import hashlib
+import json
+import time
+import pandas as pd
+import pytest
+from botocore.exceptions import ClientError
+from storage import (HASH_METADATA_KEY, compressed_path, csv_compression, file_digests, open_artifact,
+                     upload_artifact, upload_extra_args)
+
+@pytest.fixture
+def artifact(tmp_path):
+    path = tmp_path / 'cleaned_data_20250101_100000.csv'
+    content = b'id,nome\n1,Ana\n'
+    path.write_bytes(content)
+    return str(path), hashlib.md5(content).hexdigest(), hashlib.sha256(content).hexdigest()
+
+def test_skips_upload_when_sha256_metadata_matches(artifact, stub_s3):
+    path, _, sha256 = artifact
+    s3 = stub_s3({'ETag': '"d41d8cd98f00b204e9800998ecf8427e-2"', 'Metadata': {HASH_METADATA_KEY: sha256}})
+    assert upload_artifact(s3, path, 'bucket', 'processed-data/key.csv') is False
+    assert s3.uploads == []
+
+def test_skips_upload_when_single_part_etag_matches(artifact, stub_s3):
+    path, md5, _ = artifact
+    s3 = stub_s3({'ETag': f'"{md5}"', 'Metadata': {}})
+    assert upload_artifact(s3, path, 'bucket', 'processed-data/key.csv') is False
+    assert s3.uploads == []
+
+def test_uploads_when_multipart_etag_cannot_be_compared(artifact, stub_s3):
+    path, md5, _ = artifact
+    s3 = stub_s3({'ETag': f'"{md5}-2"', 'Metadata': {}})
+    assert upload_artifact(s3, path, 'bucket', 'processed-data/key.csv') is True
+    assert len(s3.uploads) == 1
+
+@pytest.mark.parametrize('error_code', ['404', 'NoSuchKey', 'NotFound'])
+def test_uploads_when_object_is_missing(artifact, error_code, stub_s3):
+    path, _, sha256 = artifact
+    s3 = stub_s3(error_code=error_code)
+    assert upload_artifact(s3, path, 'bucket', 'processed-data/key.csv') is True
+    upload = s3.uploads[0]
+    assert upload['Key'] == 'processed-data/key.csv'
+    assert upload['ExtraArgs']['Metadata'] == {HASH_METADATA_KEY: sha256}
+    assert upload['ExtraArgs']['ContentType'] == 'text/csv'
+
+def test_uploads_when_content_changed(artifact, stub_s3):
+    path, _, _ = artifact
+    s3 = stub_s3({'ETag': '"0"', 'Metadata': {HASH_METADATA_KEY: hashlib.sha256(b'old content').hexdigest()}})
+    assert upload_artifact(s3, path, 'bucket', 'processed-data/key.csv') is True
+    assert len(s3.uploads) == 1
+
+def test_other_head_errors_are_raised(artifact, stub_s3):
+    path, _, _ = artifact
+    s3 = stub_s3(error_code='403')
+    with pytest.raises(ClientError):
+        upload_artifact(s3, path, 'bucket', 'processed-data/key.csv')
+    assert s3.uploads == []
+
+@pytest.mark.parametrize('compression, extension', [('none', ''), ('gzip', '.gz'), ('zstd', '.zst')])
+def test_compressed_path(compression, extension):
+    assert compressed_path('arquivos/cleaned_data.csv', compression) == f"arquivos/cleaned_data.csv{extension}"
+
+def test_compressed_path_rejects_unknown_compression():
+    with pytest.raises(ValueError):
+        compressed_path('cleaned_data.csv', 'bz2')
+
+@pytest.mark.parametrize('compression', ['gzip', 'zstd'])
+def test_csv_round_trip(tmp_path, compression):
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+    path = compressed_path(str(tmp_path / 'cleaned_data.csv'), compression)
+    df = pd.DataFrame({'id': [1, 2], 'nome': ['Ana', 'José']})
+
+    df.to_csv(path, index=False, compression=csv_compression(path))
+
+    pd.testing.assert_frame_equal(pd.read_csv(path), df)
+    with open_artifact(path, 'rt') as f:
+        assert f.readline() == 'id,nome\n'
+
+@pytest.mark.parametrize('compression', ['none', 'gzip', 'zstd'])
+def test_json_round_trip(tmp_path, compression):
+    if compression == 'zstd':
+        pytest.importorskip('zstandard')
+    path = compressed_path(str(tmp_path / 'metrics.json'), compression)
+    metrics = {'linhas': 10, 'coluna': 'salário'}
+
+    with open_artifact(path, 'wt') as f:
+        json.dump(metrics, f)
+    with open_artifact(path, 'rt') as f:
+        assert json.load(f) == metrics
+
+def test_gzip_output_is_identical_across_reruns(tmp_path):
+    # The hash skip of upload_artifact only works if a rerun writes the same bytes: gzip must not store the write time
+    csv_path = str(tmp_path / 'cleaned_data.csv.gz')
+    json_path = str(tmp_path / 'metrics.json.gz')
+    df = pd.DataFrame({'id': [1, 2], 'nome': ['Ana', 'Rui']})
+
+    digests = []
+    for _ in range(2):
+        df.to_csv(csv_path, index=False, compression=csv_compression(csv_path))
+        with open_artifact(json_path, 'wt') as f:
+            json.dump({'linhas': 2}, f)
+        digests.append((file_digests(csv_path), file_digests(json_path)))
+        # gzip headers have a one second resolution
+        time.sleep(1.1)
+    assert digests[0] == digests[1]
+
+@pytest.mark.parametrize('path, expected', [
+    ('cleaned_data.csv', {'ContentType': 'text/csv'}),
+    ('cleaned_data.csv.gz', {'ContentType': 'text/csv', 'ContentEncoding': 'gzip'}),
+    ('metrics.json.zst', {'ContentType': 'application/json', 'ContentEncoding': 'zstd'}),
+    ('validation_report.html', {'ContentType': 'text/html'}),
+    ('handoff.arrow', {})
+])
+def test_upload_extra_args(path, expected):
+    assert upload_extra_args(path) == expected